@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+'''
+n_method 缓存命中时的单次调用开销
+
+    python benchmarks/bench_n_method.py [--number 200000]
+'''
+import argparse
+import timeit
+
+from n_property import n_class, n_method
+from n_property.utils import HashableList, HashableDict
+
+
+@n_class
+class Row(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_method(implement='get_ps')
+    def p(self, incr=0, extra=None):
+        return
+
+    @classmethod
+    def get_ps(cls, insts, incr=0, extra=None):
+        return [self.a + incr for self in insts]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args()
+
+    row = Row(1)
+    fallback = Row.__dict__['p'].fallback
+    cases = (
+        ('no args', lambda: row.p()),
+        ('positional', lambda: row.p(1)),
+        ('keyword', lambda: row.p(incr=1)),
+        ('unhashable', lambda: row.p(1, extra={'l': [1]})),
+        ('legacy key only', lambda: hash(
+            (fallback, HashableList((1,)), HashableDict({'incr': 1})))),
+    )
+    for name, func in cases:
+        func()
+        t = timeit.timeit(func, number=args.number)
+        print('{:<16} {:8.3f} us/call'.format(name, t / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+'''
+对比 session key 策略的单对象构造开销与每个对象的内存
+
+    python benchmarks/bench_session_key.py [--depth 60] [--number 10000]
+'''
+import argparse
+import gc
+import timeit
+import tracemalloc
+
+from n_property import (
+    n_class, n_property, get_frame_key, get_frame_chain_id, set_session_key,
+)
+
+
+@n_class
+class Row(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return [self.a for self in selfs]
+
+
+def at_depth(depth, func):
+    if depth <= 0:
+        return func()
+    return at_depth(depth - 1, func)
+
+
+def bench(strategy, depth, number):
+    set_session_key(strategy)
+    try:
+        t = at_depth(depth, lambda: timeit.timeit(lambda: Row(1), number=number))
+    finally:
+        set_session_key(None)
+    return t / number * 1e6
+
+
+def memory(strategy, depth, number):
+    '''
+    构造 number 个对象后每个对象占用的字节数（包括 session key 与 registry 中的记录）
+    '''
+    set_session_key(strategy)
+    try:
+        def build():
+            rows = [Row(1)]  # 先构造一次，不计入第一次格式化 key 的开销
+            gc.collect()
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            rows.extend(Row(i) for i in range(number))
+            used = tracemalloc.get_traced_memory()[0] - base
+            tracemalloc.stop()
+            return used
+        used = at_depth(depth, build)
+    finally:
+        set_session_key(None)
+    return float(used) / number
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=60)
+    parser.add_argument('--number', type=int, default=10000)
+    args = parser.parse_args()
+
+    for name, strategy in (
+        ('get_frame_chain_id', get_frame_chain_id),
+        ('get_frame_key', get_frame_key),
+    ):
+        print('{:<20} depth={:<4} {:8.2f} us/instance {:8.1f} bytes/instance'.format(
+            name, args.depth, bench(strategy, args.depth, args.number),
+            memory(strategy, args.depth, args.number)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+'''
+基准测试集：构造、第一次访问、批量访问、缓存命中、n_method 参数 key 以及每个对象的内存
+
+    PYTHONPATH=. python benchmarks/suite.py --output before.json
+    PYTHONPATH=. python benchmarks/suite.py --output after.json --compare before.json
+
+批量获取方法用 time.sleep(--latency) 模拟后端延迟；每个用例重复 --repeat 次取最小值与中位数，
+结果（每个对象/每次调用的微秒数）可以保存为 JSON，--compare 与之前的结果对比。
+--quick 只跑较小的 session。
+'''
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from n_property import (
+    n_class, n_property, n_method, LRUCache,
+    get_frame_chain_id, set_session_key, prefetch,
+)
+
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+LATENCY = [0.0]
+
+
+def backend(ids):
+    if LATENCY[0]:
+        time.sleep(LATENCY[0])
+    return ids
+
+
+cache = LRUCache(maxsize=200000)
+
+
+@n_class
+class Row(object):
+    def __init__(self, a):
+        self.a = a
+
+    p = n_property(fallback=None)
+
+    @p.n_getter
+    @classmethod
+    def get_ps(cls, insts):
+        return backend([self.a for self in insts])
+
+    cached = n_property(fallback=None, cache=cache, key=lambda inst: inst.a)
+
+    @cached.n_getter
+    @classmethod
+    def get_cacheds(cls, insts):
+        return backend([self.a for self in insts])
+
+    @n_method(implement='get_ms')
+    def m(self, incr=0, extra=None):
+        return
+
+    @classmethod
+    def get_ms(cls, insts, incr=0, extra=None):
+        return backend([self.a + incr for self in insts])
+
+
+@n_class
+class SlotRow(object):
+    __slots__ = ('a', '__weakref__')
+
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return backend([self.a for self in selfs])
+
+
+class Plain(object):
+    def __init__(self, a):
+        self.a = a
+
+
+def at_depth(depth, func):
+    if depth <= 0:
+        return func()
+    return at_depth(depth - 1, func)
+
+
+def make(cls, n):
+    return [cls(i) for i in range(n)]
+
+
+def measure(setup, run, repeat):
+    '''
+    每次重复先调用 setup（不计时），再对其返回值计时 run
+    '''
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        gc.disable()
+        start = clock()
+        run(arg)
+        times.append(clock() - start)
+        gc.enable()
+        del arg
+    return times
+
+
+def bench_construct(sizes, repeat):
+    for depth in (1, 20, 60):
+        for strategy, name in ((None, 'frame_key'), (get_frame_chain_id, 'chain_id')):
+            set_session_key(strategy)
+            try:
+                n = 2000
+                times = at_depth(depth, lambda: measure(lambda: None, lambda _: make(Row, n), repeat))
+            finally:
+                set_session_key(None)
+            yield 'construct/%s/depth=%d' % (name, depth), n, times
+
+    n = 2000
+    yield 'construct/plain', n, measure(lambda: None, lambda _: make(Plain, n), repeat)
+    yield 'construct/slots', n, measure(lambda: None, lambda _: make(SlotRow, n), repeat)
+
+
+def bench_access(sizes, repeat):
+    for size in sizes:
+        yield 'first_access/size=%d' % size, 1, measure(
+            lambda: make(Row, size), lambda rows: rows[0].p, repeat)
+
+        def access_all(rows):
+            for row in rows:
+                row.p
+        yield 'batch_access/size=%d' % size, size, measure(lambda: make(Row, size), access_all, repeat)
+
+        def fetched(cls=Row):
+            rows = make(cls, size)
+            access_all(rows)
+            return rows
+        yield 'second_access/size=%d' % size, size, measure(fetched, access_all, repeat)
+        yield 'second_access/slots/size=%d' % size, size, measure(
+            lambda: fetched(SlotRow), access_all, repeat)
+
+        yield 'prefetch/size=%d' % size, size, measure(
+            lambda: make(Row, size), lambda rows: prefetch(rows, 'p'), repeat)
+
+        def cache_hit_setup():
+            rows = make(Row, size)
+            for row in rows:
+                row.cached
+            return make(Row, size)
+
+        def cache_access(rows):
+            for row in rows:
+                row.cached
+        yield 'cache_hit/size=%d' % size, size, measure(cache_hit_setup, cache_access, repeat)
+        cache.clear()
+
+
+def bench_n_method(sizes, repeat):
+    n = 10000
+    row = Row(1)
+    cases = (
+        ('no_args', lambda: row.m()),
+        ('positional', lambda: row.m(1)),
+        ('keyword', lambda: row.m(incr=1)),
+        ('unhashable', lambda: row.m(1, extra={'l': [1]})),
+    )
+    for name, func in cases:
+        func()
+
+        def run(_, func=func):
+            for _ in range(n):
+                func()
+        yield 'n_method_hit/%s' % name, n, measure(lambda: None, run, repeat)
+
+    for size in sizes:
+        def call_all(rows):
+            for row in rows:
+                row.m(1)
+        yield 'n_method_batch/size=%d' % size, size, measure(lambda: make(Row, size), call_all, repeat)
+
+
+def bench_memory(sizes):
+    '''
+    每个对象占用的字节数（构造后、获取 n_property 后）
+    '''
+    size = max(sizes)
+    for cls, name in ((Plain, 'plain'), (Row, 'n_class'), (SlotRow, 'slots')):
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        rows = make(cls, size)
+        built = tracemalloc.get_traced_memory()[0]
+        if cls is not Plain:
+            for row in rows:
+                row.p
+        fetched = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del rows
+        yield 'memory/%s/construct' % name, float(built - base) / size
+        if cls is not Plain:
+            yield 'memory/%s/fetched' % name, float(fetched - base) / size
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.STDOUT,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat):
+    results = {}
+    for bench in (bench_construct, bench_access, bench_n_method):
+        for name, n, times in bench(sizes, repeat):
+            times = sorted(t / n * 1e6 for t in times)
+            results[name] = {
+                'unit': 'us',
+                'n': n,
+                'min': times[0],
+                'median': times[len(times) // 2],
+            }
+            print('{:<40} {:12.3f} us  (median {:.3f})'.format(name, times[0], times[len(times) // 2]))
+    for name, value in bench_memory(sizes):
+        results[name] = {'unit': 'bytes', 'min': value, 'median': value}
+        print('{:<40} {:12.1f} bytes/inst'.format(name, value))
+    return results
+
+
+def compare(results, path):
+    with open(path) as f:
+        base = json.load(f)['results']
+    print('\n{:<40} {:>12} {:>12} {:>8}'.format('name', 'base', 'now', 'ratio'))
+    for name, r in sorted(results.items()):
+        b = base.get(name)
+        if b is None or not b['min']:
+            continue
+        print('{:<40} {:12.3f} {:12.3f} {:8.2f}'.format(name, b['min'], r['min'], r['min'] / b['min']))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0005, help='每次批量获取的模拟延迟（秒）')
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--output', help='结果保存为 JSON')
+    parser.add_argument('--compare', help='与之前保存的 JSON 对比')
+    args = parser.parse_args()
+
+    LATENCY[0] = args.latency
+    sizes = (1, 100, 1000) if args.quick else (1, 100, 10000, 100000)
+    results = run(sizes, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'latency': args.latency,
+                'sizes': sizes,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,16 +5,38 @@ import weakref
 import sys
 import types
 import logging
+import time
 from functools import partial, wraps
 from collections import OrderedDict
 
-from .utils import HashableList, HashableDict
+from .utils import HashableList, HashableDict, NError, freeze, run_batches
+from .storage import state_of, side_state, frame_id_of, set_frame_id, supports_weakref
+from . import metrics
+from .flight import SingleFlight
+from .columns import column_factory, column_key, gather, dedupe, scatter
+from .registry import SessionRegistry, sessions, get_registry, set_isolation
+from .policy import (
+    check_policy, is_eager, probed, batched, set_prefetch_policy, get_prefetch_policy,
+    EAGER, SECOND_ACCESS, ADAPTIVE,
+)
+from .deferred import n_deferred, current_deferred, flush, resolve, Lazy
+from .session import (
+    get_frame_key, format_frame_key, set_session_key, get_session_key,
+    n_session, current_session, batch_session,
+)
 
 
 _missing = object()
+_kwargs_mark = object()
+
+MISSING = _missing  # 批量获取方法中表示单个结果缺失，使用 fallback
 
 
 def get_frame_chain_id(start_depth=1):
+    '''
+    旧的 session key 策略：遍历整个调用栈并拼成字符串
+    可通过 set_session_key(get_frame_chain_id) 恢复
+    '''
     depth = start_depth
 
     frames = OrderedDict()
@@ -54,25 +76,55 @@ def get_frame_chain_id(start_depth=1):
     return '|'.join(pieces)
 
 
-class NError(Exception):
-    pass
-
-
 class n_property(object):
     '''
     解决成本较高的 property 调用的n+1问题
     开发者定义property时即定义取得批量结果的方法，使用时正常使用。
     在同一批对象的该property被第二次使用时，自动批量预获取同一批对象剩余的property
     注意：定义n_property时必须保证结果数量与传入的selfs数量一致，否则report error 并fallback成None值
+    ttl（秒）：结果与过期时间一起保存，过期后再次访问时重新批量获取；
+    设置 ttl 后结果不再替换 property，每次访问都会检查过期时间
+    single_flight=True：多个线程同时获取相同的 key（或相同对象）时只获取一次，见 flight.py
     '''
-    sessions = {}
-    counts = {}
+    sessions = sessions
 
-    def __init__(self, fallback=None):
+    is_async = False
+
+    def __init__(
+        self, fallback=None, prefetch=None, max_batch=None, executor=None, co_fetch=(),
+        cache=None, key=None, columns=(), column_type=None, dedupe=False, ttl=None,
+        single_flight=False,
+    ):
         self.fallback = None
         self.func = None
         self.__name__ = ''
+        self.namespace = ''
         self.is_classmethod = False
+        self.prefetch = check_policy(prefetch)
+        self.max_batch = max_batch
+        self.executor = executor
+        self.co_fetch = tuple(co_fetch)
+        self.columns = tuple(columns)
+        self.column_type = column_factory(column_type)
+        self.column_key = column_key(self.columns) if self.columns else None
+        self.cache = cache
+        self.key = key or self.column_key
+        self.dedupe = dedupe
+        self.ttl = ttl
+        self.flights = SingleFlight() if single_flight else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.dedup_insts = 0
+        self.dedup_keys = 0
+
+        if cache is not None and self.key is None:
+            raise NError('Please provide key for cache !!!')
+        if dedupe and self.key is None:
+            raise NError('Please provide key for dedupe !!!')
+        if ttl is not None and self.is_async:
+            raise NError('ttl is not supported by async_n_property !!!')
+        if single_flight and self.is_async:
+            raise NError('single_flight is not supported by async_n_property !!!')
 
         if isinstance(fallback, types.FunctionType):
             self._init_func(fallback)
@@ -102,46 +154,205 @@ class n_property(object):
         if obj is None:
             return self
 
-        frame_id = obj._nc_frame_id
-        session_key = (objtype, frame_id)
-        count_key = (frame_id, self.__name__)
+        state = state_of(obj)
+        val = self._value(state)
+        if val is not _missing:  # 只有 __slots__ 类或设置了 ttl 才会走到这里，其他情况结果已经替换了 property
+            return val
 
-        session = self.sessions.get(session_key)
-        count = self.counts.get(count_key, 0)
-        self.counts[count_key] = count + 1
+        loader = current_deferred()
+        if loader is not None:
+            return loader.defer(self, obj)
 
-        if not session:
-            insts = []
+        session, insts = self._collect(obj, objtype)
+        if self.co_fetch:
+            prefetch(insts, self.__name__, *self.co_fetch)  # 同时获取一起使用的 n_property
         else:
-            _session = []
-            insts = [r() for r in session]
-            _session = [r for r, i in zip(session, insts) if i is not None]
-            insts = [i for i in (insts + [obj]) if i and self.__name__ not in i.__dict__]
-            self.sessions[session_key] = _session
+            self._fill(obj.__class__, insts)
+
+        if len(insts) > 1 and session is not None:
+            session.counts.pop(self.__name__, None)
+        return self._stored(state)
+
+    def _flush_deferred(self, cls, items):
+        '''
+        n_deferred 中被访问过的对象一次获取
+        '''
+        insts = [inst for inst, _ in items]
+        pending = [inst for inst in insts if self._value(state_of(inst)) is _missing]
+        if self.co_fetch:
+            prefetch(pending, self.__name__, *self.co_fetch)
+        elif pending:
+            self._fill(cls, pending)
+        return [self._stored(state_of(inst)) for inst in insts]
+
+    def _stored(self, state):
+        '''
+        刚写入的结果，不检查是否过期
+        '''
+        if self.ttl is not None:
+            return state[self._ttl_key][0]
+        return state[self.__name__]
+
+    @property
+    def _ttl_key(self):
+        return '_nc_ttl_' + self.__name__
+
+    def _value(self, state):
+        '''
+        返回 state 中保存的结果，没有或已过期时返回 _missing
+        '''
+        if self.ttl is None:
+            return state.get(self.__name__, _missing)
+        entry = state.get(self._ttl_key)
+        if entry is None or entry[1] <= time.time():
+            return _missing
+        return entry[0]
 
-        if count < 1:
-            insts = [obj]
-        elif obj not in insts:
+    def _fill(self, cls, insts):
+        res = self._fetch(cls, insts)
+        if self.ttl is None:
+            for inst, r in zip(insts, res):
+                state_of(inst)[self.__name__] = r  # 写入对象，替换property
+        else:
+            ttl_key, expires = self._ttl_key, time.time() + self.ttl
+            for inst, r in zip(insts, res):
+                state_of(inst)[ttl_key] = (r, expires)
+
+    def _invalidate(self, insts):
+        '''
+        删除 insts 上保存的结果以及跨请求缓存中的结果
+        '''
+        for inst in insts:
+            state = state_of(inst)
+            state.pop(self.__name__, None)
+            state.pop(self._ttl_key, None)
+        if self.cache is not None and insts:
+            namespace = self.namespace or self.__name__
+            self.cache.delete_many(set((namespace, self.key(inst)) for inst in insts))
+
+    def _collect(self, obj, objtype, eager=False):
+        '''
+        返回 obj 所在的 session 以及本次需要批量获取的对象
+        第一次访问只获取 obj 自身（probe），除非 eager、处于 n_session 中或 prefetch 策略决定直接批量获取
+        '''
+        frame_id = frame_id_of(obj)
+        session = get_registry().get((objtype, frame_id))
+
+        if session is None:
+            count = 0
+            insts = []
+        else:
+            count = session.incr_count(self.__name__)
+            insts = [i for i in session.members() if self._value(state_of(i)) is _missing]
+
+        if count < 1 and not eager and not isinstance(frame_id, n_session):
+            site = (objtype, frame_id, self.__name__)
+            if not is_eager(self.prefetch, site):
+                probed(self.prefetch, site)
+                if metrics.current is not None:
+                    metrics.current.probe(self.namespace or self.__name__, frame_id)
+                return session, [obj]
+        elif count == 1 and len(insts) > 1:
+            batched(self.prefetch, (objtype, frame_id, self.__name__))
+
+        if not any(i is obj for i in insts):  # session 被淘汰后重建时可能不包含 obj；不能用 __eq__ 比较
             insts += [obj]
-
-        if self.is_classmethod:
-            res = self.func(obj.__class__, insts)
+        return session, insts
+
+    def _fetch(self, cls, insts):
+        '''
+        先查缓存，未命中的对象超过 max_batch 时分块获取，每块单独检查数量
+        '''
+        fetch = partial(self._fetch_chunk, cls)
+        if metrics.current is not None:
+            fetch = metrics.current.timed(
+                self.namespace or self.__name__, frame_id_of(insts[0]), fetch)
+        if self.flights is not None:
+            fetch = self.flights.wrap(fetch, self.key or id)
+        if self.cache is None:
+            res = run_batches(fetch, insts, self.max_batch, self.executor)
         else:
-            res = self.func(insts)
+            keys, res, misses = self._cache_get(insts)
+            if misses:
+                fetched = run_batches(fetch, [insts[i] for i in misses], self.max_batch, self.executor)
+                self._cache_set(keys, res, misses, fetched)
+        return [self.fallback if r is _missing else r for r in res]  # 数量不一致直接提供默认值
+
+    def _cache_get(self, insts):
+        '''
+        返回缓存 key、已命中的结果（未命中为 _missing）以及未命中的下标
+        '''
+        namespace = self.namespace or self.__name__
+        keys = [(namespace, self.key(inst)) for inst in insts]
+        found = self.cache.get_many(set(keys))
+        res = [found.get(k, _missing) for k in keys]
+        misses = [i for i, r in enumerate(res) if r is _missing]
+        self.cache_hits += len(insts) - len(misses)
+        self.cache_misses += len(misses)
+        if metrics.current is not None:
+            metrics.current.cache(self.namespace or self.__name__, len(insts) - len(misses), len(misses))
+        return keys, res, misses
+
+    def _cache_set(self, keys, res, misses, fetched):
+        mapping = {}
+        for i, r in zip(misses, fetched):
+            res[i] = r
+            if r is not _missing:
+                mapping[keys[i]] = r
+        if mapping:
+            self.cache.set_many(mapping)
+
+    def _fetch_chunk(self, cls, insts):
+        if self.columns:
+            keys, unique, columns = gather(insts, self.column_key, len(self.columns), self.column_type)
+            self._count_dedup(keys, unique)
+            return self._check(insts, scatter(keys, unique, self._call(cls, columns), _missing))
+        if self.dedupe:
+            keys, unique, reps = dedupe(insts, self.key)
+            self._count_dedup(keys, unique)
+            return self._check(insts, scatter(keys, unique, self._call(cls, [reps]), _missing))
+        return self._check(insts, self._call(cls, [insts]))
+
+    def _count_dedup(self, keys, unique):
+        self.dedup_insts += len(keys)
+        self.dedup_keys += len(unique)
+
+    @property
+    def dedup_ratio(self):
+        '''
+        去重减少的比例，0 表示没有重复的 key
+        '''
+        if not self.dedup_insts:
+            return 0.0
+        return 1 - float(self.dedup_keys) / self.dedup_insts
+
+    def stats(self):
+        return {
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'dedup_insts': self.dedup_insts,
+            'dedup_keys': self.dedup_keys,
+            'dedup_ratio': self.dedup_ratio,
+        }
+
+    def _call(self, cls, args):
+        # 批量获取方法中构造的 n_class 对象属于同一个 session
+        with batch_session(self.namespace or self.__name__):
+            return self._invoke(cls, args)
+
+    def _invoke(self, cls, args):
+        if self.is_classmethod:
+            return self.func(cls, *args)
+        return self.func(*args)
 
-        if len(res) != len(insts):
+    def _check(self, insts, res):
+        if res is None or len(res) != len(insts):
             self.report(msg='n_property length mismatch: %s' % self.__name__, level=logging.ERROR)
-            res = [self.fallback] * len(insts)  # 数量不一致直接提供默认值
-
-        if len(insts) > 1:
-            self.counts.pop(count_key, None)
-
-        for inst, r in zip(insts, res):
-            inst.__dict__[self.__name__] = r  # 写入对象，替换property
-        return obj.__dict__[self.__name__]
+            return [_missing] * len(insts)
+        return res
 
     def __set_name__(self, owner, name):
-        n_class(owner)
+        _init_class(owner)
 
     report = lambda *args, **kwargs: None
 
@@ -157,14 +368,34 @@ class NMethod(object):
     在同一批对象的该 method 被第二次使用时，自动批量预获取同一批对象剩余的 method 的返回值
     注意：
     - 定义 n_method 的 implement 时必须保证结果数量与传入的 insts 数量一致，否则 report error 并返回 fallback 值
+    - 单个结果缺失时 implement 可以返回 MISSING，同样使用 fallback 值
+    - fallback 只在需要时调用；per_inst_fallback=True 时为每个缺失结果的对象单独调用 fallback，
+      否则所有缺失结果共用当前调用的 fallback 值
+    - vectorized=True 时 implement 的签名为 implement(cls, insts, calls)，calls[i] 为 insts[i] 的 (args, kwargs)，
+      不同参数的调用可以合并为一次
+    - call_many 一次获取多个对象以不同参数调用的结果
+    - single_flight=True 时多个线程同时以相同参数调用同一对象只获取一次
     - 请使用装饰器 @n_method
     """
-    sessions = {}
-    counts = {}
+    sessions = sessions
 
-    def __init__(self, fallback=None, implement=''):
+    is_async = False
+
+    def __init__(
+        self, fallback=None, implement='', prefetch=None, max_batch=None, executor=None,
+        per_inst_fallback=False, vectorized=False, single_flight=False,
+    ):
         self.fallback = fallback
         self.implement = implement
+        self.prefetch = check_policy(prefetch)
+        self.max_batch = max_batch
+        self.executor = executor
+        self.per_inst_fallback = per_inst_fallback
+        self.vectorized = vectorized
+        self.flights = SingleFlight() if single_flight else None
+        self.__name__ = getattr(fallback, '__name__', '')
+        self.namespace = ''
+        self._implements = weakref.WeakKeyDictionary()
 
         if not isinstance(self.fallback, types.FunctionType):
             raise NError('Please use @n_method deecorator !!!')
@@ -172,92 +403,338 @@ class NMethod(object):
             raise NError('Please use instance method in @n_method !!!')
         if not isinstance(self.implement, str) or not self.implement:
             raise NError('Please use str as implement !!!')
+        if single_flight and self.is_async:
+            raise NError('single_flight is not supported by async_n_method !!!')
 
     def __get__(self, obj, objtype=None):
         if obj is None:
             return getattr(objtype, self.implement)
-        return partial(self, obj)
+        state = side_state(obj)
+        bound = state.get(self)
+        if bound is None:
+            bound = state[self] = BoundNMethod(self, obj, self._obj_cache(obj))
+        return bound
 
-    def _get_obj_cache(self, obj, key):
-        try:
-            cache = obj.__n_cache
-        except AttributeError:
-            cache = obj.__n_cache = {}
+    def __set_name__(self, owner, name):
+        self.__name__ = name
+        _init_class(owner)
+
+    def _obj_cache(self, obj):
+        state = side_state(obj)
         try:
-            return cache[key]
+            return state['_NMethod__n_cache']
         except KeyError:
-            return _missing
+            cache = state['_NMethod__n_cache'] = {}
+            return cache
+
+    def _get_obj_cache(self, obj, key):
+        return self._obj_cache(obj).get(key, _missing)
 
     def _set_obj_cache(self, obj, key, val):
-        try:
-            cache = obj.__n_cache
-        except AttributeError:
-            cache = obj.__n_cache = {}
-        cache[key] = val
+        self._obj_cache(obj)[key] = val
+
+    def _pop_obj_cache(self, obj, key):
+        return self._obj_cache(obj).pop(key, _missing)
+
+    def _invalidate(self, insts):
+        '''
+        删除 insts 上该 method 所有参数的结果，保留绑定对象
+        原地修改缓存 dict，BoundNMethod 持有的是同一个 dict
+        '''
+        fallback = self.fallback
+        for inst in insts:
+            cache = side_state(inst).get('_NMethod__n_cache')
+            if not cache:
+                continue
+            for key in [
+                k for k in cache
+                if k is fallback or (type(k) is _CallKey and k.key[0] is fallback)
+            ]:
+                del cache[key]
 
     def __call__(self, *args, **kwargs):
         obj = args[0]
-        implement = getattr(obj.__class__, self.implement)
+        key, val = self._lookup(obj, args[1:], kwargs)
+        if val is not _missing:
+            return val
+        return self._call(obj, key, args[1:], kwargs)
+
+    def _call(self, obj, key, args, kwargs):
+        '''
+        obj 的缓存中没有 key 时获取
+        '''
+        implement = self._get_implement(obj.__class__)
+        loader = current_deferred()
+        if loader is not None:
+            return loader.defer(self, obj, key, (args, kwargs))
+
+        session, insts = self._collect(obj, key)
+
+        fetch = partial(self._implement_chunk, implement, args, kwargs)
+        if metrics.current is not None:
+            fetch = metrics.current.timed(
+                self.namespace or self.__name__, frame_id_of(obj), fetch)
+        if self.flights is not None:
+            fetch = self.flights.wrap(fetch, partial(_flight_key, key))
+        res = run_batches(fetch, insts, self.max_batch, self.executor)
+
+        if len(insts) > 1 and session is not None:
+            session.counts.pop(self.fallback.__name__, None)
+
+        self._store(obj, key, insts, res, args, kwargs)
+        val = self._get_obj_cache(obj, key)
+        if val is not _missing:
+            return val
+        return self.fallback(obj, *args, **kwargs)
+
+    def _store(self, obj, key, insts, res, args, kwargs):
+        '''
+        缺失的结果使用 fallback，写入各对象的缓存
+        '''
+        if self.per_inst_fallback:
+            res = [
+                self.fallback(inst, *args, **kwargs) if r is _missing else r
+                for inst, r in zip(insts, res)
+            ]
+        elif any(r is _missing for r in res):
+            fallback_res = self.fallback(obj, *args, **kwargs)
+            res = [fallback_res if r is _missing else r for r in res]  # 数量不一致直接提供默认值
+
+        for inst, r in zip(insts, res):
+            self._set_obj_cache(inst, key, r)
+
+    def call_many(self, insts, args_list=None, kwargs_list=None):
+        '''
+        insts[i] 以 args_list[i]、kwargs_list[i] 调用，返回结果列表，结果同时写入各对象的缓存
+        未缓存的调用按参数分组，每组调用一次 implement；vectorized 时每个类只调用一次
+        '''
+        keys, res, groups = self._plan(insts, args_list, kwargs_list)
+        for cls, calls in groups.items():
+            implement = self._get_implement(cls)
+            if self.vectorized:
+                items = [(inst, args, kwargs) for args, kwargs, objs in calls.values() for inst in objs]
+                fetched = run_batches(
+                    partial(self._vector_chunk, implement), items, self.max_batch, self.executor)
+                pos = 0
+                for key, (args, kwargs, objs) in calls.items():
+                    self._store(objs[0], key, objs, fetched[pos:pos + len(objs)], args, kwargs)
+                    pos += len(objs)
+                continue
+            for key, (args, kwargs, objs) in calls.items():
+                fetch = partial(self._implement_chunk, implement, args, kwargs)
+                if self.flights is not None:
+                    fetch = self.flights.wrap(fetch, partial(_flight_key, key))
+                fetched = run_batches(fetch, objs, self.max_batch, self.executor)
+                self._store(objs[0], key, objs, fetched, args, kwargs)
+        return self._results(insts, keys, res)
+
+    def _flush_deferred(self, cls, items):
+        return self.call_many(
+            [inst for inst, _ in items], [call[0] for _, call in items], [call[1] for _, call in items])
+
+    def _plan(self, insts, args_list, kwargs_list):
+        '''
+        返回每个调用的缓存 key、已缓存的结果（未缓存为 _missing），以及按类、key 分组的未缓存调用
+        '''
+        n = len(insts)
+        args_list = [()] * n if args_list is None else [tuple(a) for a in args_list]
+        kwargs_list = [{}] * n if kwargs_list is None else kwargs_list
+        if len(args_list) != n or len(kwargs_list) != n:
+            raise NError('Please provide args for every instance !!!')
+
+        keys, res = [], []
+        groups = OrderedDict()
+        seen = set()
+        for inst, args, kwargs in zip(insts, args_list, kwargs_list):
+            key, val = self._lookup(inst, args, kwargs)
+            keys.append(key)
+            res.append(val)
+            if val is _missing and (key, id(inst)) not in seen:
+                seen.add((key, id(inst)))
+                calls = groups.setdefault(type(inst), OrderedDict())
+                calls.setdefault(key, (args, kwargs, []))[2].append(inst)
+        return keys, res, groups
+
+    def _results(self, insts, keys, res):
+        return [
+            self._get_obj_cache(inst, key) if r is _missing else r
+            for inst, key, r in zip(insts, keys, res)
+        ]
+
+    def _lookup(self, obj, args, kwargs):
+        '''
+        计算调用参数对应的缓存 key 并查找 obj 的缓存
+        '''
+        key = _call_key(self.fallback, args, kwargs)
+        return key, self._get_obj_cache(obj, key)
+
+    def _implement_chunk(self, implement, args, kwargs, insts):
+        if self.vectorized:
+            return self._vector_chunk(implement, [(inst, args, kwargs) for inst in insts])
+        # implement 中构造的 n_class 对象属于同一个 session
+        with batch_session(self.namespace or self.__name__):
+            res = implement(insts, *args, **kwargs)
+        if len(res) != len(insts):
+            self.report(msg='n_method length mismatch: %s' % self.fallback.__name__, level=logging.ERROR)
+            return [_missing] * len(insts)
+        return res
+
+    def _vector_chunk(self, implement, items):
+        '''
+        items 为 (inst, args, kwargs) 列表
+        '''
+        with batch_session(self.namespace or self.__name__):
+            res = implement([i[0] for i in items], [(i[1], i[2]) for i in items])
+        if len(res) != len(items):
+            self.report(msg='n_method length mismatch: %s' % self.fallback.__name__, level=logging.ERROR)
+            return [_missing] * len(items)
+        return res
+
+    def _get_implement(self, cls):
+        '''
+        每个类只解析、检查一次 implement
+        '''
+        try:
+            return self._implements[cls]
+        except KeyError:
+            pass
+        implement = getattr(cls, self.implement)
         if not (
             inspect.ismethod(implement) and
-            implement.__self__ is obj.__class__
+            implement.__self__ is cls
         ):
             raise NError('Please use classmethod for implement !!!')
+        self._implements[cls] = implement
+        return implement
+
+    def _collect(self, obj, key, eager=False):
+        '''
+        返回 obj 所在的 session 以及本次需要批量获取的对象
+        第一次调用只获取 obj 自身（probe），除非 eager、处于 n_session 中或 prefetch 策略决定直接批量获取
+        '''
+        frame_id = frame_id_of(obj)
+        session = get_registry().get((type(obj), frame_id))
+
+        if session is None:
+            count = 0
+            insts = [obj]
+        else:
+            count = session.incr_count(self.fallback.__name__)
+            insts = [i for i in session.members() if self._get_obj_cache(i, key) is _missing]
+
+        if count < 1 and not eager and not isinstance(frame_id, n_session):
+            site = (type(obj), frame_id, self.fallback.__name__)
+            if not is_eager(self.prefetch, site):
+                probed(self.prefetch, site)
+                if metrics.current is not None:
+                    metrics.current.probe(self.namespace or self.__name__, frame_id)
+                insts = [obj]
+        elif count == 1 and len(insts) > 1:
+            batched(self.prefetch, (type(obj), frame_id, self.fallback.__name__))
+
+        if not any(i is obj for i in insts):  # session 被淘汰后重建时可能不包含 obj
+            insts.append(obj)
+        return session, insts
 
-        key = (self.fallback, HashableList(args[1:]), HashableDict(kwargs))
-        val = self._get_obj_cache(obj, key)
-        if val is not _missing:
-            return val
+    def report(self, msg='', level=logging.INFO, *args, **kwargs):
+        logging.log(level, msg)
 
-        frame_id = obj._nc_frame_id
-        session_key = (type(obj), frame_id)
-        count_key = (frame_id, self.fallback.__name__)
 
-        session = self.sessions.get(session_key)
-        count = self.counts.get(count_key, 0)
-        self.counts[count_key] = count + 1
+def _flight_key(key, inst):
+    return key, id(inst)
 
-        if not session:
-            insts = [obj]
-        else:
-            _session = []
-            insts = [r() for r in session]
-            _session = [r for r, i in zip(session, insts) if i is not None]
-            insts = [i for i in insts if i and self._get_obj_cache(i, key) is _missing]
-            self.sessions[session_key] = _session
 
-        if count < 1:
-            insts = [obj]
+class _CallKey(object):
+    '''
+    n_method 的缓存 key，只计算一次哈希：同一次调用要在 session 中每个对象的缓存里查找、写入
+    '''
+    __slots__ = ('key', 'hash')
 
-        res = implement(insts, *args[1:], **kwargs)
-        fallback_res = self.fallback(*args, **kwargs)
-        if len(res) != len(insts):
-            self.report(msg='n_method length mismatch: %s' % fallback_res, level=logging.ERROR)
-            res = [fallback_res] * len(insts)  # 数量不一致直接提供默认值
+    def __init__(self, key):
+        self.key = key
+        self.hash = hash(key)
 
-        if len(insts) > 1:
-            self.counts.pop(count_key, None)
+    def __hash__(self):
+        return self.hash
 
-        for inst, r in zip(insts, res):
-            self._set_obj_cache(inst, key, r)
-        val = self._get_obj_cache(obj, key)
-        return val if val is not _missing else fallback_res
+    def __eq__(self, other):
+        return type(other) is _CallKey and self.key == other.key
 
-    def report(self, msg='', level=logging.INFO, *args, **kwargs):
-        logging.log(level, msg)
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '_CallKey(%r)' % (self.key,)
 
 
-def n_method(implement):
-    return partial(NMethod, implement=implement)
+def _call_key(fallback, args, kwargs):
+    '''
+    无参数时 key 为 fallback 本身，其余为 _CallKey；只有参数不可哈希时才把 list/dict/set 转为元组（freeze）
+    '''
+    if kwargs:
+        key = (fallback,) + args + (_kwargs_mark,) + tuple(sorted(kwargs.items()))
+    elif args:
+        key = (fallback,) + args
+    else:
+        return fallback
+    try:
+        return _CallKey(key)
+    except TypeError:  # 参数不可哈希
+        return _CallKey((fallback, freeze(args), _kwargs_mark, freeze(kwargs)))
+
+
+class BoundNMethod(object):
+    '''
+    obj.xxx 返回的绑定对象，每个对象只创建一次，与结果一起保存在旁路表中
+    已缓存时直接查对象的缓存，只需一次 dict 查找
+    '''
+    __slots__ = ('method', 'fallback', 'ref', 'cache')
+
+    def __init__(self, method, obj, cache):
+        self.method = method
+        self.fallback = method.fallback
+        self.ref = weakref.ref(obj)  # 旁路表随 obj 释放，避免 obj 无法回收
+        self.cache = cache
+
+    def __call__(self, *args, **kwargs):
+        key = _call_key(self.fallback, args, kwargs)
+        val = self.cache.get(key, _missing)
+        if val is not _missing:
+            return val
+        obj = self.ref()
+        if obj is None:
+            raise NError('Instance of %s has been released !!!' % self.method.__name__)
+        return self.method._call(obj, key, args, kwargs)
+
+    def __repr__(self):
+        return '<bound n_method %s of %r>' % (self.method.__name__, self.ref())
+
+
+def n_method(implement, **kwargs):
+    return partial(NMethod, implement=implement, **kwargs)
 
 
 def n_class(cls):
+    _init_class(cls)
+    for v in cls.__dict__.values():
+        if isinstance(v, NMethod) and hasattr(cls, v.implement):
+            v._get_implement(cls)  # 在装饰时解析并检查 implement
+    return cls
+
+
+def _init_class(cls):
     for k, v in cls.__dict__.items():
         if isinstance(v, n_property):
             v.__name__ = k
+            v.namespace = '%s.%s.%s' % (cls.__module__, cls.__name__, k)
+        elif isinstance(v, NMethod):
+            v.__name__ = k
+            v.namespace = '%s.%s.%s' % (cls.__module__, cls.__name__, k)
 
     if hasattr(cls, '__nc_flag__'):
         return cls
+    if not supports_weakref(cls):
+        raise NError('Please add __weakref__ to __slots__ of %s !!!' % cls.__name__)
 
     old_new = cls.__new__
 
@@ -270,16 +747,13 @@ def n_class(cls):
         else:
             inst = old_new(_cls, *args, **kwargs)
 
-        frame_id = get_frame_chain_id()
-        inst._nc_frame_id = frame_id
-        ref = weakref.ref(inst)
-        session_key = (_cls, frame_id)
-        if n_property.sessions.get(session_key) is None:
-            n_property.sessions[session_key] = []
-        n_property.sessions[session_key].append(ref)
-        if NMethod.sessions.get(session_key) is None:
-            NMethod.sessions[session_key] = []
-        NMethod.sessions[session_key].append(ref)
+        frame_id = current_session()
+        if frame_id is None:
+            frame_id = get_session_key()()
+        set_frame_id(inst, frame_id)
+        get_registry().add((_cls, frame_id), inst)
+        if metrics.current is not None:
+            metrics.current.created(_cls, frame_id)
 
         return inst
 
@@ -287,3 +761,14 @@ def n_class(cls):
     cls.__nc_flag__ = True
 
     return cls
+
+
+if sys.version_info >= (3, 5):
+    from .aio import async_n_property, async_n_method, AsyncNMethod  # noqa
+
+from .prefetch import prefetch, call_many, set_executor as set_prefetch_executor  # noqa
+from .cache import Cache, LRUCache  # noqa
+from .shared import SharedMemoryCache  # noqa
+from .metrics import Metrics, set_metrics, get_metrics  # noqa
+from .profiler import Profiler  # noqa
+from .invalidate import invalidate, invalidate_session, refresh  # noqa
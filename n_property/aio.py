@@ -0,0 +1,259 @@
+# encoding: utf-8
+'''
+asyncio 版本的 n_property / n_method，批量获取方法为协程
+
+    @n_class
+    class Review(object):
+        subject = async_n_property(fallback=None)
+
+        @subject.n_getter
+        @classmethod
+        async def get_subjects(cls, insts):
+            ...
+
+    subjects = await asyncio.gather(*[r.subject for r in reviews])  # 只有 1 次请求
+
+- 第一次访问即对整个 session 批量获取，不需要 probe
+- 访问时先把同一批对象标记为等待中，第一次 await 才真正发起请求；
+  在请求完成前，其他 task 访问同一批对象会等待同一个请求；
+  某个等待的 task 被取消（如超时）时请求继续进行，不影响其他 task
+'''
+import asyncio
+import logging
+from functools import partial
+
+from . import n_property, NMethod, _missing, metrics
+from .session import batch_session
+from .storage import state_of, frame_id_of
+from .columns import gather, dedupe, scatter
+
+
+async def run_batches(func, items, max_batch=None):
+    '''
+    utils.run_batches 的协程版本，各块并发执行
+    '''
+    if not max_batch or len(items) <= max_batch:
+        return await func(items)
+
+    chunks = [items[i:i + max_batch] for i in range(0, len(items), max_batch)]
+    res = []
+    for r in await asyncio.gather(*[func(chunk) for chunk in chunks]):
+        res.extend(r)
+    return res
+
+
+def timed(stats, name, site, func):
+    '''
+    Metrics.timed 的协程版本
+    '''
+    async def run(insts):
+        start = stats.batch_start(name, insts)
+        try:
+            res = await func(insts)
+        except BaseException as e:
+            stats.batch_end(name, site, insts, start, e)
+            raise
+        stats.batch_end(name, site, insts, start)
+        return res
+    return run
+
+
+class _Done(object):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return self.value
+        yield  # noqa 使之成为生成器
+
+
+class _Batch(object):
+    __slots__ = ('run', 'future')
+
+    def __init__(self, run):
+        self.run = run
+        self.future = None
+
+    def wait(self):
+        if self.future is None:
+            self.future = asyncio.ensure_future(self.run())
+        return asyncio.shield(self.future)  # 取消等待不会取消共用的请求
+
+
+class _Pending(object):
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    def __await__(self):
+        results = yield from self.batch.wait().__await__()
+        return results[self.index]
+
+
+class async_n_property(n_property):
+    '''
+    obj.xxx 返回 awaitable，await 得到结果
+    '''
+    is_async = True
+
+    def __get__(self, obj, objtype):
+        if obj is None:
+            return self
+
+        state = state_of(obj)
+        val = state.get(self.__name__, _missing)
+        if val is not _missing:  # __slots__ 类
+            return val
+
+        _, insts = self._collect(obj, objtype, eager=True)
+        batch = _Batch(partial(self._run, obj.__class__, insts))
+        for index, inst in enumerate(insts):
+            state_of(inst)[self.__name__] = _Pending(batch, index)
+        return state[self.__name__]
+
+    async def _fetch_chunk(self, cls, insts):
+        if self.columns:
+            keys, unique, columns = gather(insts, self.column_key, len(self.columns), self.column_type)
+            self._count_dedup(keys, unique)
+            return self._check(insts, scatter(keys, unique, await self._call(cls, columns), _missing))
+        if self.dedupe:
+            keys, unique, reps = dedupe(insts, self.key)
+            self._count_dedup(keys, unique)
+            return self._check(insts, scatter(keys, unique, await self._call(cls, [reps]), _missing))
+        return self._check(insts, await self._call(cls, [insts]))
+
+    async def _call(self, cls, args):
+        with batch_session(self.namespace or self.__name__):
+            return await self._invoke(cls, args)
+
+    async def _fetch(self, cls, insts):
+        fetch = partial(self._fetch_chunk, cls)
+        if metrics.current is not None:
+            fetch = timed(
+                metrics.current, self.namespace or self.__name__,
+                frame_id_of(insts[0]), fetch,
+            )
+        if self.cache is None:
+            res = await run_batches(fetch, insts, self.max_batch)
+        else:
+            keys, res, misses = self._cache_get(insts)
+            if misses:
+                fetched = await run_batches(fetch, [insts[i] for i in misses], self.max_batch)
+                self._cache_set(keys, res, misses, fetched)
+        return [self.fallback if r is _missing else r for r in res]  # 数量不一致直接提供默认值
+
+    async def _run(self, cls, insts):
+        name = self.__name__
+        try:
+            res = await self._fetch(cls, insts)
+        except BaseException:
+            for inst in insts:
+                state_of(inst).pop(name, None)  # 下次访问重新获取
+            raise
+
+        for inst, r in zip(insts, res):
+            state_of(inst)[name] = _Done(r)
+        return res
+
+
+class AsyncNMethod(NMethod):
+    '''
+    obj.xxx(...) 返回 awaitable，await 得到结果；implement 与 fallback 都是协程
+    '''
+    is_async = True
+
+    def __call__(self, *args, **kwargs):
+        obj = args[0]
+        key, val = self._lookup(obj, args[1:], kwargs)
+        if val is not _missing:
+            return val
+        return self._call(obj, key, args[1:], kwargs)
+
+    def _call(self, obj, key, args, kwargs):
+        implement = self._get_implement(obj.__class__)
+
+        _, insts = self._collect(obj, key, eager=True)
+        batch = _Batch(partial(self._run, implement, key, insts, obj, args, kwargs))
+        for index, inst in enumerate(insts):
+            self._set_obj_cache(inst, key, _Pending(batch, index))
+        return self._get_obj_cache(obj, key)
+
+    async def _implement_chunk(self, implement, args, kwargs, insts):
+        if self.vectorized:
+            return await self._vector_chunk(implement, [(inst, args, kwargs) for inst in insts])
+        with batch_session(self.namespace or self.__name__):
+            res = await implement(insts, *args, **kwargs)
+        if len(res) != len(insts):
+            self.report(msg='n_method length mismatch: %s' % self.fallback.__name__, level=logging.ERROR)
+            return [_missing] * len(insts)
+        return res
+
+    async def _vector_chunk(self, implement, items):
+        with batch_session(self.namespace or self.__name__):
+            res = await implement([i[0] for i in items], [(i[1], i[2]) for i in items])
+        if len(res) != len(items):
+            self.report(msg='n_method length mismatch: %s' % self.fallback.__name__, level=logging.ERROR)
+            return [_missing] * len(items)
+        return res
+
+    async def _run(self, implement, key, insts, obj, args, kwargs):
+        fetch = partial(self._implement_chunk, implement, args, kwargs)
+        if metrics.current is not None:
+            fetch = timed(
+                metrics.current, self.namespace or self.__name__,
+                frame_id_of(obj), fetch,
+            )
+        try:
+            res = await run_batches(fetch, insts, self.max_batch)
+        except BaseException:
+            for inst in insts:
+                self._pop_obj_cache(inst, key)
+            raise
+
+        return await self._store(obj, key, insts, res, args, kwargs)
+
+    async def _store(self, obj, key, insts, res, args, kwargs):
+        if self.per_inst_fallback:
+            res = list(res)
+            for i, r in enumerate(res):  # 推导式中使用 await 需要 Python 3.6
+                if r is _missing:
+                    res[i] = await self.fallback(insts[i], *args, **kwargs)
+        elif any(r is _missing for r in res):
+            fallback_res = await self.fallback(obj, *args, **kwargs)
+            res = [fallback_res if r is _missing else r for r in res]  # 数量不一致直接提供默认值
+
+        for inst, r in zip(insts, res):
+            self._set_obj_cache(inst, key, _Done(r))
+        return res
+
+    async def call_many(self, insts, args_list=None, kwargs_list=None):
+        keys, res, groups = self._plan(insts, args_list, kwargs_list)
+        jobs = []
+        for cls, calls in groups.items():
+            implement = self._get_implement(cls)
+            if self.vectorized:
+                jobs.append(self._run_vector(implement, calls))
+                continue
+            for key, (args, kwargs, objs) in calls.items():
+                jobs.append(self._run(implement, key, objs, objs[0], args, kwargs))
+        await asyncio.gather(*jobs)
+        results = []
+        for r in self._results(insts, keys, res):
+            results.append(await r)
+        return results
+
+    async def _run_vector(self, implement, calls):
+        items = [(inst, args, kwargs) for args, kwargs, objs in calls.values() for inst in objs]
+        fetched = await run_batches(partial(self._vector_chunk, implement), items, self.max_batch)
+        pos = 0
+        for key, (args, kwargs, objs) in calls.items():
+            await self._store(objs[0], key, objs, fetched[pos:pos + len(objs)], args, kwargs)
+            pos += len(objs)
+
+
+def async_n_method(implement, **kwargs):
+    return partial(AsyncNMethod, implement=implement, **kwargs)
@@ -0,0 +1,96 @@
+# encoding: utf-8
+'''
+n_property 批量结果的跨请求缓存
+
+    subject = n_property(fallback=None, cache=LRUCache(10000, ttl=60), key=lambda inst: inst.subject_id)
+
+n_property 只对缓存未命中的对象调用批量获取方法，命中的结果按顺序合并回去。
+缓存的 key 为 (n_property 的完整名字, key(inst))，数量不一致时的 fallback 值不会被缓存。
+
+外部缓存（memcached、redis 等）继承 Cache 实现 get_many/set_many 即可。
+'''
+import threading
+import time
+from collections import OrderedDict
+
+
+class Cache(object):
+
+    def get_many(self, keys):
+        '''
+        返回 {key: value}，只包含命中的 key
+        '''
+        raise NotImplementedError
+
+    def set_many(self, mapping):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+
+class LRUCache(Cache):
+    '''
+    进程内缓存，超过 maxsize 时淘汰最久未使用的结果，ttl（秒）过期
+    '''
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (value, expires)
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        now = time.time() if self.ttl is not None else None
+        data = self._data
+        with self._lock:
+            for key in keys:
+                try:
+                    value, expires = data.pop(key)
+                except KeyError:
+                    self.misses += 1
+                    continue
+                if expires is not None and expires < now:
+                    self.misses += 1
+                    continue
+                data[key] = (value, expires)
+                found[key] = value
+                self.hits += 1
+        return found
+
+    def set_many(self, mapping):
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        data = self._data
+        with self._lock:
+            for key, value in mapping.items():
+                data.pop(key, None)
+                data[key] = (value, expires)
+            while len(data) > self.maxsize:
+                data.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': float(self.hits) / total if total else 0.0,
+        }
@@ -0,0 +1,106 @@
+# encoding: utf-8
+'''
+按列传参的批量获取方法
+
+    @n_property(columns=('subject_id',))
+    def subject(subject_ids):
+        return Subject.gets(subject_ids)  # 或 {subject_id: subject}
+
+声明 columns 后，批量获取方法收到去重后的列而不是对象列表：
+一个列时为 func(column)，多个列时为 func(column1, column2, ...)。
+返回与去重后的 key 一一对应的序列，或 {key: value}（缺少的 key 使用 fallback）。
+多个列时 key 为各列值组成的元组。
+
+column_type 指定列的类型：默认 list，可以是任意接受一个列表的 callable
+（如 functools.partial(array.array, 'q')），或 'numpy'。
+'''
+from collections import OrderedDict
+from operator import attrgetter
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+from .utils import NError
+
+
+def column_factory(column_type):
+    if column_type is None or column_type == 'list':
+        return None
+    if column_type == 'numpy':
+        try:
+            import numpy
+        except ImportError:
+            raise NError('Please install numpy to use column_type="numpy" !!!')
+        return numpy.asarray
+    if not callable(column_type):
+        raise NError('Please use callable, "list" or "numpy" as column_type !!!')
+    return column_type
+
+
+def column_key(columns):
+    return attrgetter(*columns)
+
+
+def gather(insts, key, n_columns, factory=None):
+    '''
+    返回每个对象的 key、去重后的 key 以及传给批量获取方法的各列
+    '''
+    keys = [key(inst) for inst in insts]
+    unique = list(OrderedDict.fromkeys(keys)) if _hashable(keys) else keys
+    if n_columns == 1:
+        columns = [unique]
+    else:
+        columns = [list(c) for c in zip(*unique)] or [[] for _ in range(n_columns)]
+    if factory is not None:
+        columns = [factory(c) for c in columns]
+    return keys, unique, columns
+
+
+def dedupe(insts, key):
+    '''
+    返回每个对象的 key、去重后的 key 以及每个 key 对应的第一个对象；
+    去重后的 key 按第一次出现的顺序排列，key 不可哈希时用 == 逐个比较
+    '''
+    keys = [key(inst) for inst in insts]
+    if not _hashable(keys):
+        unique, reps = [], []
+        for k, inst in zip(keys, insts):
+            if k not in unique:
+                unique.append(k)
+                reps.append(inst)
+        return keys, unique, reps
+    first = OrderedDict()
+    for k, inst in zip(keys, insts):
+        first.setdefault(k, inst)
+    unique = list(first)
+    return keys, unique, list(first.values())
+
+
+def scatter(keys, unique, res, missing):
+    '''
+    把批量获取方法的结果按 key 分发回每个对象；
+    数量不一致时返回 None
+    '''
+    if isinstance(res, Mapping):
+        return [res.get(k, missing) for k in keys]
+    if len(res) != len(unique):
+        return None
+    if unique is keys:
+        return list(res)
+    try:
+        found = dict(zip(unique, res))
+    except TypeError:  # key 不可哈希
+        res = list(res)
+        return [res[unique.index(k)] for k in keys]
+    return [found[k] for k in keys]
+
+
+def _hashable(keys):
+    try:
+        for k in keys:
+            hash(k)
+    except TypeError:
+        return False
+    return True
@@ -0,0 +1,188 @@
+# encoding: utf-8
+'''
+延迟获取：作用域内访问 n_property/n_method 只返回占位对象并记录请求，
+flush 时每个 n_property/n_method（按类）只调用一次批量获取方法
+
+    with n_deferred():
+        data = [serialize(review) for review in reviews]  # 访问顺序任意
+    data = resolve(data)  # 把占位对象替换为结果
+
+- 作用域结束时自动 flush，也可以在作用域内调用 flush()
+- 使用占位对象（属性、比较、迭代、str 等）时会先 flush 全部请求，使用方式与结果基本一致；
+  但 `is None`、isinstance 等判断的是占位对象本身，需要先 resolve
+- 只获取被访问过的对象，不会额外获取同一 session 的其他对象；已获取的结果直接返回
+- flush 期间执行的批量获取方法不会被延迟
+- 不影响 async_n_property / async_n_method
+'''
+from collections import OrderedDict
+
+from .utils import ContextVar, NError
+
+
+_current = ContextVar('n_property_deferred', default=None)
+_unresolved = object()
+
+
+def current_deferred():
+    return _current.get()
+
+
+class n_deferred(object):
+
+    def __init__(self):
+        self.pending = OrderedDict()  # (descriptor, 类) -> {(id(inst), key): (inst, call, Lazy)}
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._tokens.pop())
+        if exc_type is None:
+            self.flush()
+
+    def defer(self, descr, inst, key=None, call=None):
+        '''
+        记录一次访问，返回占位对象；同一对象的同一请求共用一个占位对象
+        '''
+        items = self.pending.setdefault((descr, type(inst)), OrderedDict())
+        item = items.get((id(inst), key))
+        if item is None:
+            item = items[(id(inst), key)] = (inst, call, Lazy(self))
+        return item[2]
+
+    def flush(self):
+        '''
+        解析所有等待中的请求；出错时尚未解析的请求保留到下次 flush
+        '''
+        token = _current.set(None)
+        try:
+            while self.pending:
+                (descr, cls), items = self.pending.popitem(last=False)
+                items = list(items.values())
+                res = descr._flush_deferred(cls, [(inst, call) for inst, call, _ in items])
+                for (_, _, lazy), r in zip(items, res):
+                    lazy._value = r
+        finally:
+            _current.reset(token)
+
+
+def flush():
+    '''
+    解析当前作用域中等待中的请求
+    '''
+    loader = _current.get()
+    if loader is not None:
+        loader.flush()
+
+
+def resolve(value):
+    '''
+    把 value（可以是嵌套的 dict/list/tuple）中的占位对象替换为结果
+    '''
+    if isinstance(value, Lazy):
+        return value.value
+    if isinstance(value, dict):
+        return type(value)((k, resolve(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve(v) for v in value)
+    return value
+
+
+class Lazy(object):
+    '''
+    延迟获取的占位对象，使用时解析
+    '''
+    __slots__ = ('_loader', '_value')
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = _unresolved
+
+    @property
+    def value(self):
+        if self._value is _unresolved:
+            self._loader.flush()
+            if self._value is _unresolved:
+                raise NError('Deferred value failed to resolve !!!')
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self.value, name)
+
+    def __repr__(self):
+        if self._value is _unresolved:
+            return '<Lazy pending>'
+        return repr(self._value)
+
+    def __str__(self):
+        return str(self.value)
+
+    def __bool__(self):
+        return bool(self.value)
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        return self.value == resolve(other)
+
+    def __ne__(self, other):
+        return self.value != resolve(other)
+
+    def __lt__(self, other):
+        return self.value < resolve(other)
+
+    def __le__(self, other):
+        return self.value <= resolve(other)
+
+    def __gt__(self, other):
+        return self.value > resolve(other)
+
+    def __ge__(self, other):
+        return self.value >= resolve(other)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __contains__(self, item):
+        return item in self.value
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __call__(self, *args, **kwargs):
+        return self.value(*args, **kwargs)
+
+    def __int__(self):
+        return int(self.value)
+
+    def __float__(self):
+        return float(self.value)
+
+    def __index__(self):
+        return self.value.__index__()
+
+    def __add__(self, other):
+        return self.value + resolve(other)
+
+    def __radd__(self, other):
+        return resolve(other) + self.value
+
+    def __sub__(self, other):
+        return self.value - resolve(other)
+
+    def __rsub__(self, other):
+        return resolve(other) - self.value
+
+    def __mul__(self, other):
+        return self.value * resolve(other)
+
+    def __rmul__(self, other):
+        return resolve(other) * self.value
@@ -0,0 +1,99 @@
+# encoding: utf-8
+'''
+single-flight：多个线程（或 greenlet）同时获取相同 key 时只有一个真正调用批量获取方法，其余等待并共用结果
+
+    subject = n_property(fallback=None, key=lambda r: r.subject_id, single_flight=True)
+
+- 以 key 为粒度：部分重叠的两批对象只各自获取对方没有在获取的 key
+- 没有声明 key 时以对象本身为 key，即多个线程同时访问同一批对象
+- 获取出错时，等待的线程自己重新获取
+- 只合并同时进行中的获取：结果写入对象（或缓存）之前，刚完成获取时到达的请求仍可能再次获取
+- 同一线程在批量获取方法中再次获取正在获取的 key 时不等待，直接获取
+'''
+import threading
+
+try:
+    from threading import get_ident
+except ImportError:  # Python 2
+    from thread import get_ident
+
+
+class Flight(object):
+    __slots__ = ('event', 'value', 'error', 'owner')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.owner = get_ident()
+
+
+class SingleFlight(object):
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.shared = 0  # 共用其他线程结果的次数
+
+    def __len__(self):
+        return len(self._flights)
+
+    def wrap(self, func, key):
+        '''
+        包装批量获取函数 func(items)，key(item) 为每个对象的 key
+        '''
+        def run(items):
+            return self.run(func, [key(item) for item in items], items)
+        return run
+
+    def run(self, func, keys, items):
+        own, waits = [], []
+        with self._lock:
+            flights = self._flights
+            for i, key in enumerate(keys):
+                flight = flights.get(key)
+                if flight is None:
+                    flight = flights[key] = Flight()
+                    own.append((i, key, flight))
+                else:
+                    waits.append((i, flight))
+
+        res = [None] * len(items)
+        if own:
+            self._fly(func, items, own, res)
+
+        retry = []
+        me = get_ident()
+        for i, flight in waits:
+            if flight.owner == me and not flight.event.is_set():  # 在自己的批量获取中，避免死锁
+                retry.append(i)
+                continue
+            flight.event.wait()
+            if flight.error is not None:
+                retry.append(i)
+            else:
+                res[i] = flight.value
+                self.shared += 1
+        if retry:
+            for i, r in zip(retry, func([items[i] for i in retry])):
+                res[i] = r
+        return res
+
+    def _fly(self, func, items, own, res):
+        error = None
+        try:
+            fetched = func([items[i] for i, _, _ in own])
+            for (i, _, flight), r in zip(own, fetched):
+                res[i] = flight.value = r
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                for _, key, flight in own:
+                    if error is not None:
+                        flight.error = error
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+            for _, _, flight in own:
+                flight.event.set()
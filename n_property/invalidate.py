@@ -0,0 +1,79 @@
+# encoding: utf-8
+'''
+清除、刷新已经获取的 n_property / n_method 结果
+
+    invalidate(review, 'subject')          # 只清除 review 的 subject
+    invalidate_session(review, 'subject')  # 清除与 review 同一 session 的所有对象
+    refresh(reviews, 'subject')            # 清除后一次批量重新获取
+
+不传名字时处理类上所有的 n_property 与 n_method。
+跨请求缓存（cache=）中对应的结果一并删除；n_method 的结果只清除，下次调用时重新获取。
+'''
+from collections import OrderedDict
+
+from . import n_property, NMethod, NError
+from .storage import frame_id_of
+from .registry import get_registry
+from .prefetch import prefetch
+
+
+def _descriptors(cls, names):
+    found = {}
+    for klass in reversed(cls.__mro__):  # 子类覆盖父类
+        for k, v in klass.__dict__.items():
+            if isinstance(v, (n_property, NMethod)):
+                found[k] = v
+    if not names:
+        return sorted(found.items())
+    for name in names:
+        if name not in found:
+            raise NError('%s.%s is not a n_property or n_method !!!' % (cls.__name__, name))
+    return [(name, found[name]) for name in names]
+
+
+def _group(insts):
+    groups = OrderedDict()
+    for inst in insts:
+        if inst is not None:
+            groups.setdefault(type(inst), []).append(inst)
+    return groups
+
+
+def _invalidate(insts, names):
+    for cls, objs in _group(insts).items():
+        for _, descr in _descriptors(cls, names):
+            descr._invalidate(objs)
+
+
+def invalidate(inst, *names):
+    _invalidate([inst], names)
+
+
+def invalidate_session(inst, *names):
+    '''
+    清除 inst 所在 session 中所有对象的结果
+    '''
+    frame_id = frame_id_of(inst)
+    session = get_registry().get((type(inst), frame_id))
+    insts = session.members() if session is not None else []
+    if inst not in insts:
+        insts.append(inst)
+    _invalidate(insts, names)
+
+
+def refresh(insts, *names, **kwargs):
+    '''
+    清除 insts 的结果后，每个 n_property 对整批对象只调用一次批量获取方法
+    kwargs 传给 prefetch（executor）
+    '''
+    for cls, objs in _group(insts).items():
+        descrs = _descriptors(cls, names)
+        for _, descr in descrs:
+            descr._invalidate(objs)
+        props = [
+            name for name, descr in descrs
+            if isinstance(descr, n_property) and not (descr.is_async and not names)
+        ]
+        if props:
+            prefetch(objs, *props, **kwargs)
+    return insts
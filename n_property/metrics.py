@@ -0,0 +1,193 @@
+# encoding: utf-8
+'''
+批量获取的计数与钩子
+
+    metrics = Metrics()
+    set_metrics(metrics)
+    ...
+    metrics.as_dict()  # 按 n_property/n_method 与调用位置统计
+
+每个属性记录批量调用次数、批量大小分布（按 2 的幂分桶）、批量获取方法耗时、
+probe（第一次访问只获取自身）次数与跨请求缓存命中率，并附带 session 注册表的大小。
+调用位置为属性名 + 构造对象的位置（session key）；在批量获取方法中构造的对象以该 n_property/n_method 为位置。
+
+before_batch(name, insts) / after_batch(name, insts, elapsed, error) 钩子在每次调用批量获取方法
+（分块时为每一块）前后调用。
+
+未调用 set_metrics 时 current 为 None，n_property/n_method 只多一次 is not None 判断。
+'''
+import threading
+import time
+from collections import OrderedDict
+
+from .session import format_frame_key, report_site
+from .registry import get_registry
+
+
+try:
+    clock = time.perf_counter
+except AttributeError:  # Python 2
+    clock = time.time
+
+current = None
+
+
+def set_metrics(metrics):
+    '''
+    开启统计，传入 None 时关闭
+    '''
+    global current
+    current = metrics
+
+
+def get_metrics():
+    return current
+
+
+def _bucket(size):
+    return 1 << (size - 1).bit_length() if size > 1 else size
+
+
+class Stats(object):
+    __slots__ = ('batches', 'insts', 'probes', 'errors', 'elapsed', 'max_elapsed',
+                 'sizes', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.batches = 0
+        self.insts = 0
+        self.probes = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.max_elapsed = 0.0
+        self.sizes = {}  # 批量大小的上界 -> 次数
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add_batch(self, size, elapsed, error):
+        self.batches += 1
+        self.insts += size
+        self.elapsed += elapsed
+        if elapsed > self.max_elapsed:
+            self.max_elapsed = elapsed
+        if error is not None:
+            self.errors += 1
+        bucket = _bucket(size)
+        self.sizes[bucket] = self.sizes.get(bucket, 0) + 1
+
+    def as_dict(self):
+        cache_total = self.cache_hits + self.cache_misses
+        return {
+            'batches': self.batches,
+            'insts': self.insts,
+            'probes': self.probes,
+            'errors': self.errors,
+            'elapsed': self.elapsed,
+            'max_elapsed': self.max_elapsed,
+            'mean_elapsed': self.elapsed / self.batches if self.batches else 0.0,
+            'mean_size': float(self.insts) / self.batches if self.batches else 0.0,
+            'sizes': dict(self.sizes),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'hit_rate': float(self.cache_hits) / cache_total if cache_total else 0.0,
+        }
+
+
+class Metrics(object):
+    '''
+    线程安全；调用位置最多记录 max_sites 个，超出时淘汰最早的
+    '''
+
+    def __init__(self, max_sites=4096):
+        self.max_sites = max_sites
+        self.properties = {}
+        self.sites = OrderedDict()
+        self.before_batch = []
+        self.after_batch = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, before=None, after=None):
+        if before is not None:
+            self.before_batch.append(before)
+        if after is not None:
+            self.after_batch.append(after)
+
+    def _stats(self, name, site):
+        '''
+        需在锁内调用
+        '''
+        prop = self.properties.get(name)
+        if prop is None:
+            prop = self.properties[name] = Stats()
+        if site is None:
+            return prop, None
+        key = (name, report_site(site))
+        by_site = self.sites.get(key)
+        if by_site is None:
+            by_site = self.sites[key] = Stats()
+            if len(self.sites) > self.max_sites:
+                self.sites.popitem(last=False)
+        return prop, by_site
+
+    def batch_start(self, name, insts):
+        for hook in self.before_batch:
+            hook(name, insts)
+        return clock()
+
+    def batch_end(self, name, site, insts, start, error=None):
+        elapsed = clock() - start
+        with self._lock:
+            for stats in self._stats(name, site):
+                if stats is not None:
+                    stats.add_batch(len(insts), elapsed, error)
+        for hook in self.after_batch:
+            hook(name, insts, elapsed, error)
+
+    def probe(self, name, site):
+        with self._lock:
+            for stats in self._stats(name, site):
+                if stats is not None:
+                    stats.probes += 1
+
+    def created(self, cls, site):
+        '''
+        n_class 构造对象时调用，供子类使用
+        '''
+
+    def cache(self, name, hits, misses):
+        with self._lock:
+            prop, _ = self._stats(name, None)
+            prop.cache_hits += hits
+            prop.cache_misses += misses
+
+    def timed(self, name, site, func):
+        '''
+        包装批量获取函数 func(insts)，记录每次调用
+        '''
+        def run(insts):
+            start = self.batch_start(name, insts)
+            try:
+                res = func(insts)
+            except BaseException as e:
+                self.batch_end(name, site, insts, start, e)
+                raise
+            self.batch_end(name, site, insts, start)
+            return res
+        return run
+
+    def clear(self):
+        with self._lock:
+            self.properties.clear()
+            self.sites.clear()
+
+    def as_dict(self):
+        with self._lock:
+            properties = [(k, v.as_dict()) for k, v in self.properties.items()]
+            sites = [(k, v.as_dict()) for k, v in self.sites.items()]
+        return {
+            'properties': dict(properties),
+            'sites': dict(
+                ('%s @ %s' % (name, format_frame_key(site)), stats) for (name, site), stats in sites
+            ),
+            'registry': get_registry().stats(),
+        }
+
@@ -0,0 +1,103 @@
+# encoding: utf-8
+'''
+prefetch 策略：第一次访问时是否直接批量获取整个 session
+
+- second_access: 第一次访问只获取自身（probe），第二次访问才批量获取（默认，与之前的行为一致）
+- eager: 第一次访问即批量获取
+- adaptive: 按调用位置（构造对象的位置 + 属性名）记录 probe 之后是否发生了批量获取，
+  经常发生的位置直接批量获取
+'''
+from collections import OrderedDict
+
+from .utils import NError
+
+
+EAGER = 'eager'
+SECOND_ACCESS = 'second_access'
+ADAPTIVE = 'adaptive'
+
+POLICIES = (EAGER, SECOND_ACCESS, ADAPTIVE)
+
+
+class AdaptivePolicy(object):
+
+    def __init__(self, min_samples=3, threshold=0.5, max_sites=4096, decay_at=64):
+        self.min_samples = min_samples
+        self.threshold = threshold
+        self.max_sites = max_sites
+        self.decay_at = decay_at
+        self.history = OrderedDict()  # site -> [probe 次数, probe 之后批量获取的次数, 直接批量获取的次数]
+
+    def _get(self, site):
+        h = self.history.get(site)
+        if h is None:
+            h = self.history[site] = [0, 0, 0]
+            if len(self.history) > self.max_sites:
+                self.history.popitem(last=False)
+        return h
+
+    def is_eager(self, site):
+        h = self.history.get(site)
+        if h is None or h[0] < self.min_samples:
+            return False
+        if h[1] < h[0] * self.threshold:
+            return False
+        # 直接批量获取期间不再产生样本，定期 probe 一次以便重新评估
+        h[2] += 1
+        return h[2] % self.decay_at != 0
+
+    def probed(self, site):
+        h = self._get(site)
+        h[0] += 1
+        if h[0] > self.decay_at:
+            h[0] //= 2
+            h[1] //= 2
+
+    def batched(self, site):
+        h = self.history.get(site)
+        if h is not None:
+            h[1] += 1
+
+    def clear(self):
+        self.history.clear()
+
+
+adaptive = AdaptivePolicy()
+_policy = SECOND_ACCESS
+
+
+def set_prefetch_policy(policy):
+    '''
+    全局默认的 prefetch 策略，n_property/n_method 的 prefetch 参数优先
+    '''
+    global _policy
+    _policy = check_policy(policy) or SECOND_ACCESS
+
+
+def get_prefetch_policy():
+    return _policy
+
+
+def check_policy(policy):
+    if policy is not None and policy not in POLICIES:
+        raise NError('Please use one of %s as prefetch !!!' % ', '.join(POLICIES))
+    return policy
+
+
+def is_eager(policy, site):
+    policy = policy or _policy
+    if policy == SECOND_ACCESS:
+        return False
+    if policy == EAGER:
+        return True
+    return adaptive.is_eager(site)
+
+
+def probed(policy, site):
+    if (policy or _policy) == ADAPTIVE:
+        adaptive.probed(site)
+
+
+def batched(policy, site):
+    if (policy or _policy) == ADAPTIVE:
+        adaptive.batched(site)
@@ -0,0 +1,141 @@
+# encoding: utf-8
+'''
+一次获取同一批对象的多个 n_property，各个批量获取方法并发执行
+
+    prefetch(reviews, 'subject', 'author', 'tags')
+
+也可以在定义时声明一起使用的 n_property，获取 subject 时同时获取 author、tags：
+
+    subject = n_property(co_fetch=('author', 'tags'))
+
+按路径获取关联对象的 n_property，每层一次批量获取：
+
+    prefetch(reviews, 'subject__author', 'subject__tags')
+
+n_method 以不同参数调用时，用 call_many 一次获取：
+
+    call_many(users, 'greeting', [(user.locale,) for user in users])
+'''
+from collections import OrderedDict
+
+from . import n_property, NMethod, NError, _missing
+from .storage import state_of
+from .registry import in_context
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # Python 2 未安装 futures
+    ThreadPoolExecutor = None
+
+
+DEFAULT_MAX_WORKERS = 8
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None and ThreadPoolExecutor is not None:
+        _executor = ThreadPoolExecutor(DEFAULT_MAX_WORKERS)
+    return _executor
+
+
+def set_executor(executor):
+    '''
+    替换 prefetch 默认使用的线程池；传入 None 时恢复默认
+    批量获取方法依赖线程局部状态（如数据库连接）时，可以传入合适的 executor
+    '''
+    global _executor
+    _executor = executor
+
+
+def prefetch(insts, *names, **kwargs):
+    '''
+    为 insts 中尚未获取的对象批量获取 names 中的每个 n_property，写入对象
+    不同类的对象分别获取；多个批量获取方法在 executor 中并发执行，当前线程执行其中一个
+    name 可以是 'subject__author' 形式的路径：先获取 subject，再对所有 subject 批量获取 author，
+    结果为 list/tuple/set 时展开；k 层路径只需要 k 次批量获取
+    '''
+    executor = kwargs.pop('executor', None)
+    if kwargs:
+        raise TypeError('unexpected keyword arguments: %s' % ', '.join(kwargs))
+
+    paths = OrderedDict()  # 第一层 -> 剩余的路径
+    for name in names:
+        head, _, rest = name.partition('__')
+        paths.setdefault(head, [])
+        if rest:
+            paths[head].append(rest)
+
+    objs = [inst for inst in insts if inst is not None]
+    _prefetch(objs, list(paths), executor)
+    for head, rest in paths.items():
+        if rest:
+            related = _related(objs, head)
+            if related:
+                prefetch(related, *rest, executor=executor)
+    return insts
+
+
+def _related(insts, name):
+    '''
+    insts 的 name 结果，展开容器、去掉 None 与重复的对象
+    '''
+    seen = set()
+    related = []
+    for inst in insts:
+        value = getattr(inst, name)
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+        for v in values:
+            if v is not None and id(v) not in seen:
+                seen.add(id(v))
+                related.append(v)
+    return related
+
+
+def _prefetch(insts, names, executor):
+    groups = OrderedDict()
+    for inst in insts:
+        groups.setdefault(type(inst), []).append(inst)
+
+    jobs = []
+    for cls, objs in groups.items():
+        for name in names:
+            prop = getattr(cls, name, None)
+            if not isinstance(prop, n_property):
+                raise NError('%s.%s is not a n_property !!!' % (cls.__name__, name))
+            if prop.is_async:
+                raise NError('Please await %s.%s instead of prefetch !!!' % (cls.__name__, name))
+            pending = [o for o in objs if prop._value(state_of(o)) is _missing]
+            if pending:
+                jobs.append((prop, cls, pending))
+
+    if len(jobs) > 1:
+        executor = executor or get_executor()
+    if len(jobs) < 2 or executor is None:
+        for prop, cls, pending in jobs:
+            prop._fill(cls, pending)
+        return
+
+    futures = [executor.submit(in_context(prop._fill), cls, pending) for prop, cls, pending in jobs[1:]]
+    prop, cls, pending = jobs[0]
+    prop._fill(cls, pending)
+    for future in futures:
+        future.result()
+
+
+def call_many(insts, name, args_list=None, kwargs_list=None):
+    '''
+    insts[i].name(*args_list[i], **kwargs_list[i]) 的结果列表，相同参数的调用合并为一次批量获取
+    '''
+    insts = list(insts)
+    if not insts:
+        return []
+    cls = type(insts[0])
+    for klass in cls.__mro__:
+        method = klass.__dict__.get(name)
+        if method is not None:
+            break
+    if not isinstance(method, NMethod):
+        raise NError('%s.%s is not a n_method !!!' % (cls.__name__, name))
+    return method.call_many(insts, args_list, kwargs_list)
@@ -0,0 +1,208 @@
+# encoding: utf-8
+'''
+n+1 分析：找出没有被批量获取的访问
+
+    profiler = Profiler()
+    with profiler:
+        handle_request()
+    print(profiler.report())
+
+    Profiler().start(at_exit=True)  # 进程退出时输出报告
+
+报告按次数排序，包括：
+- 单个对象获取（probe 或 session 中只剩一个对象）最多的 n_property/n_method 及调用位置
+- 同一 session 中有多个对象，却从未批量获取过的 n_property/n_method
+- n_class 类中被同一 session 的多个对象调用的普通 property/方法，可以考虑改为 n_property/n_method
+
+调用位置为构造对象的位置（session key），同一位置本应一起获取的对象分布在多个位置时，
+说明 session key 把它们拆开了；在批量获取方法中构造的对象以该 n_property/n_method 为位置。
+普通 property/方法只在开启期间被替换为记录调用的版本，stop 时恢复。
+'''
+from __future__ import print_function
+
+import atexit
+import sys
+import types
+import weakref
+from collections import OrderedDict
+from functools import partial, wraps
+
+from . import n_property, NMethod, metrics
+from .metrics import Metrics
+from .session import format_frame_key, report_site
+from .storage import frame_id_of
+from .registry import get_registry
+
+
+class Profiler(Metrics):
+
+    def __init__(self, max_sites=4096, patch=True, max_insts=1000):
+        super(Profiler, self).__init__(max_sites)
+        self.patch = patch
+        self.max_insts = max_insts
+        self.session_sizes = OrderedDict()  # (类名, site) -> session 中同时存活的最多对象数
+        self.plain = OrderedDict()  # (类名.属性名, site) -> [调用次数, 调用过的对象数, {对象 id: weakref}]
+        self._patched = {}  # 类 -> [(属性名, 原值)]
+        self._previous = None
+
+    def start(self, at_exit=False):
+        self._previous = metrics.current
+        metrics.set_metrics(self)
+        if at_exit:
+            atexit.register(self._print_report)
+        return self
+
+    def stop(self):
+        if metrics.current is self:
+            metrics.set_metrics(self._previous)
+        self._previous = None
+        for cls, attrs in self._patched.items():
+            for attr, value in attrs:
+                setattr(cls, attr, value)
+        self._patched.clear()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _print_report(self):
+        print(self.report(), file=sys.stderr)
+
+    def created(self, cls, site):
+        session = get_registry().get((cls, site))
+        alive = session.alive if session is not None else 1
+        with self._lock:
+            key = ('%s.%s' % (cls.__module__, cls.__name__), report_site(site))
+            if alive > self.session_sizes.get(key, 0):
+                self.session_sizes[key] = alive
+                if len(self.session_sizes) > self.max_sites:
+                    self.session_sizes.popitem(last=False)
+            if self.patch and cls not in self._patched:
+                self._patch(cls)
+
+    def _patch(self, cls):
+        '''
+        需在锁内调用；只替换类自身定义的普通 property 与方法
+        '''
+        attrs = self._patched[cls] = []
+        name = '%s.%s' % (cls.__module__, cls.__name__)
+        for attr, value in list(cls.__dict__.items()):
+            if attr.startswith('__') or isinstance(value, (n_property, NMethod)):
+                continue
+            if isinstance(value, property) and value.fget is not None:
+                wrapped = property(
+                    self._wrap('%s.%s' % (name, attr), value.fget), value.fset, value.fdel, value.__doc__)
+            elif isinstance(value, types.FunctionType):
+                wrapped = self._wrap('%s.%s' % (name, attr), value)
+            else:
+                continue
+            attrs.append((attr, value))
+            setattr(cls, attr, wrapped)
+
+    def _wrap(self, name, func):
+        profiler = self
+
+        @wraps(func)
+        def wrapper(inst, *args, **kwargs):
+            profiler._record(name, inst)
+            return func(inst, *args, **kwargs)
+        return wrapper
+
+    def _record(self, name, inst):
+        '''
+        对象以 weakref 记录，被回收后 id 被复用也不会与之前的对象混淆
+        '''
+        site = report_site(frame_id_of(inst))
+        with self._lock:
+            key = (name, site)
+            entry = self.plain.get(key)
+            if entry is None:
+                entry = self.plain[key] = [0, 0, {}]
+                if len(self.plain) > self.max_sites:
+                    self.plain.popitem(last=False)
+            entry[0] += 1
+            refs = entry[2]
+            ref = refs.get(id(inst))
+            if (ref is None or ref() is not inst) and entry[1] < self.max_insts:
+                entry[1] += 1
+                refs[id(inst)] = weakref.ref(inst, partial(_forget, refs, id(inst)))
+
+    def clear(self):
+        super(Profiler, self).clear()
+        with self._lock:
+            self.session_sizes.clear()
+            self.plain.clear()
+
+    def singletons(self):
+        '''
+        [(单个对象获取次数, 名字, site)]，按次数从多到少
+        '''
+        with self._lock:
+            rows = [
+                (stats.sizes.get(1, 0), name, site)
+                for (name, site), stats in self.sites.items()
+            ]
+        return sorted((r for r in rows if r[0]), key=lambda r: -r[0])
+
+    def unbatched(self):
+        '''
+        [(session 中的对象数, 单个对象获取次数, 名字, site)]：session 中有多个对象却从未批量获取
+        '''
+        with self._lock:
+            rows = []
+            for (name, site), stats in self.sites.items():
+                if set(stats.sizes) != {1}:
+                    continue
+                size = self.session_sizes.get((name.rsplit('.', 1)[0], site), 0)
+                if size > 1 and stats.batches > 1:
+                    rows.append((size, stats.batches, name, site))
+        return sorted(rows, key=lambda r: (-r[1], -r[0]))
+
+    def repeated(self):
+        '''
+        [(调用过的对象数, 调用次数, 名字, site)]：被同一 session 的多个对象调用的普通 property/方法
+        '''
+        with self._lock:
+            rows = [
+                (count, calls, name, site)
+                for (name, site), (calls, count, _) in self.plain.items()
+                if count > 1
+            ]
+        return sorted(rows, key=lambda r: (-r[0], -r[1]))
+
+    def report(self, limit=20):
+        lines = []
+
+        def section(title, header, rows):
+            lines.append('== %s ==' % title)
+            if not rows:
+                lines.append('  (none)')
+            else:
+                lines.append(header)
+                for row in rows[:limit]:
+                    lines.append('  '.join(
+                        ['%10d' % v for v in row[:-2]] + ['%s @ %s' % (row[-2], format_frame_key(row[-1]))]
+                    ))
+            lines.append('')
+
+        section('singleton fetches', '%10s  %s' % ('fetches', 'name @ site'), self.singletons())
+        section(
+            'sessions never batched', '%10s  %10s  %s' % ('insts', 'fetches', 'name @ site'),
+            self.unbatched(),
+        )
+        section(
+            'plain attributes used across siblings', '%10s  %10s  %s' % ('insts', 'calls', 'name @ site'),
+            self.repeated(),
+        )
+        return '\n'.join(lines)
+
+
+def _forget(refs, key, ref):
+    '''
+    weakref 回调，可能在持有锁时由 gc 触发，不加锁；id 已被新对象使用时不删除
+    '''
+    if refs.get(key) is ref:
+        del refs[key]
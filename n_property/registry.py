@@ -0,0 +1,231 @@
+# encoding: utf-8
+'''
+session 注册表：记录每个 (类, session key) 下构造过的对象
+
+- 对象被回收时通过 weakref 回调计数，session 内对象全部回收后整条记录删除
+- max_sessions 限制 session 数量，超出时淘汰最久未使用的 session（LRU）
+- ttl（秒）之内未被使用的 session 会被淘汰
+- 每个 session 的访问计数（n_property/n_method 的 probe 计数）跟随 session 一起删除
+- n_property 与 n_method 共用同一个注册表，每个对象只记录一个 weakref
+'''
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from .utils import ContextVar, NError, copy_context
+
+
+DEFAULT_MAX_SESSIONS = 65536
+
+
+class Session(object):
+    __slots__ = ('refs', 'counts', 'alive', 'touched', 'callback', 'lock')
+
+    def __init__(self, callback, lock):
+        self.refs = []
+        self.counts = {}
+        self.alive = 0
+        self.touched = 0
+        self.callback = callback
+        self.lock = lock
+
+    def append(self, ref):
+        with self.lock:
+            refs = self.refs
+            refs.append(ref)
+            self.alive += 1
+            if len(refs) > 2 * self.alive + 8:  # 死引用超过一半时压缩，均摊 O(1)
+                self.refs = [r for r in refs if r() is not None]
+
+    def members(self):
+        with self.lock:
+            insts = [r() for r in self.refs]
+            if len(insts) != self.alive:
+                self.refs = [r for r, i in zip(self.refs, insts) if i is not None]
+        return [i for i in insts if i is not None]
+
+    def incr_count(self, name):
+        with self.lock:
+            count = self.counts.get(name, 0)
+            self.counts[name] = count + 1
+        return count
+
+
+class SessionRegistry(object):
+    '''
+    线程安全：所有修改都在同一把（可重入）锁内进行，并发构造、访问不会丢失对象；
+    并发访问同一 session 时仍可能各自发起一次批量请求，结果相同
+
+    settings 为读取 max_sessions、ttl 的注册表，默认为自身；
+    线程、上下文隔离的注册表使用全局注册表的设置，之后修改全局设置同样生效
+    '''
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl=None, settings=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.settings = self if settings is None else settings
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()  # weakref 回调可能在持有锁的线程里触发
+
+    def _new_session(self, key):
+        sessions = self._sessions
+        lock = self._lock
+
+        def callback(ref):
+            with lock:
+                session.alive -= 1
+                if session.alive <= 0 and sessions.get(key) is session:
+                    del sessions[key]
+
+        session = Session(callback, lock)
+        return session
+
+    def add(self, key, inst):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._new_session(key)
+                max_sessions = self.settings.max_sessions
+                if max_sessions and len(self._sessions) > max_sessions:
+                    self._sessions.popitem(last=False)
+            session.append(weakref.ref(inst, session.callback))
+            self._touch(key, session)
+
+    def get(self, key):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._touch(key, session)
+        return session
+
+    def _touch(self, key, session):
+        sessions = self._sessions
+        sessions.pop(key, None)
+        sessions[key] = session  # 移到末尾，OrderedDict 的头部即最久未使用
+        ttl = self.settings.ttl
+        if ttl is None:
+            return
+        now = time.time()
+        session.touched = now
+        while sessions:
+            oldest_key = next(iter(sessions))
+            if now - sessions[oldest_key].touched <= ttl:
+                break
+            del sessions[oldest_key]
+
+    def discard(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, key):
+        return key in self._sessions
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        refs = sum(len(s.refs) for s in sessions)
+        size = sys.getsizeof(self._sessions)
+        for s in sessions:
+            size += (
+                sys.getsizeof(s) + sys.getsizeof(s.refs) + sys.getsizeof(s.counts)
+            )
+        if sessions and refs:
+            size += refs * sys.getsizeof(next(r for s in sessions for r in s.refs))
+        return {
+            'sessions': len(sessions),
+            'refs': refs,
+            'alive': sum(s.alive for s in sessions),
+            'counts': sum(len(s.counts) for s in sessions),
+            'bytes': size,
+        }
+
+
+sessions = SessionRegistry()
+
+_thread = threading.local()
+_context = ContextVar('n_property_sessions', default=None)
+
+
+def _global_registry():
+    return sessions
+
+
+def _thread_registry():
+    try:
+        return _thread.registry
+    except AttributeError:
+        registry = _thread.registry = SessionRegistry(settings=sessions)
+        return registry
+
+
+def _context_registry():
+    registry = _context.get()
+    if registry is None:
+        registry = SessionRegistry(settings=sessions)
+        _context.set(registry)
+    return registry
+
+
+_isolations = {
+    'global': _global_registry,
+    'thread': _thread_registry,
+    'context': _context_registry,
+}
+current_registry = _global_registry
+
+
+def set_isolation(mode):
+    '''
+    session 注册表的隔离方式
+
+    - global: 进程内共用一个注册表（默认）
+    - thread: 每个线程一个注册表，线程池中的请求互不影响
+    - context: 每个 contextvars 上下文一个注册表，asyncio task 在第一次构造对象时创建自己的注册表；
+      若父 task 已经创建过，子 task 会继承同一个
+    '''
+    global current_registry
+    try:
+        current_registry = _isolations[mode]
+    except KeyError:
+        raise NError('Please use one of %s as isolation !!!' % ', '.join(sorted(_isolations)))
+
+
+_pinned = ContextVar('n_property_pinned_sessions', default=None)
+
+
+def get_registry():
+    registry = _pinned.get()
+    if registry is not None:
+        return registry
+    return current_registry()
+
+
+def in_context(func):
+    '''
+    包装提交到线程池的 func：在调用方 contextvars 上下文的副本中执行，并使用调用方的注册表，
+    批量获取方法中构造的对象与调用方线程（或 task）中的对象注册在一起
+    '''
+    registry = get_registry()
+    context = copy_context() if copy_context is not None else None
+
+    def pinned(*args, **kwargs):
+        token = _pinned.set(registry)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _pinned.reset(token)
+
+    def run(*args, **kwargs):
+        if context is None:
+            return pinned(*args, **kwargs)
+        return context.copy().run(pinned, *args, **kwargs)  # 同一个上下文不能在多个线程中同时进入
+    return run
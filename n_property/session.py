@@ -0,0 +1,170 @@
+# encoding: utf-8
+'''
+session key: 决定哪些对象属于同一批（session）
+
+n_class 在每次构造对象时调用当前的 session key 策略，
+返回值相同（且类相同）的对象会被放进同一个 session 一起 prefetch。
+'''
+import dis
+import sys
+from functools import wraps
+
+from .utils import ContextVar
+
+
+DEFAULT_MAX_DEPTH = 10
+
+
+def get_frame_key(start_depth=2, max_depth=DEFAULT_MAX_DEPTH):
+    '''
+    默认策略：只向上走 max_depth 层 frame，按 (code, lasti) 找到驻留的 'file:line<-line|...' 字符串作为 key
+    同一位置构造的对象共用同一个字符串，可以 pickle；相比 get_frame_chain_id 只在第一次遇到时格式化，
+    也不用遍历整个调用栈
+    start_depth=2 跳过调用方（n_class 的 __new__ 包装）自身
+    '''
+    try:
+        frame = sys._getframe(start_depth)
+    except ValueError:
+        return ''
+
+    key = []
+    while frame is not None and len(key) < max_depth:
+        key.append((frame.f_code, frame.f_lasti))
+        frame = frame.f_back
+    return _intern(tuple(key))
+
+
+_interned = {}
+_INTERNED_LIMIT = 4096
+
+
+def _intern(key):
+    try:
+        return _interned[key]
+    except KeyError:
+        pass
+
+    pieces = []
+    for code, lasti in key:
+        line = _lineno(code, lasti)
+        if pieces and pieces[-1][0] == code.co_filename:
+            pieces[-1][1].append(line)
+        else:
+            pieces.append((code.co_filename, [line]))
+    s = '|'.join(
+        '{}:{}'.format(name, '<-'.join(str(l) for l in lines))
+        for name, lines in pieces
+    )
+
+    if len(_interned) >= _INTERNED_LIMIT:  # 清空后重新格式化的字符串与之前的相等，分组不受影响
+        _interned.clear()
+    return _interned.setdefault(key, s)
+
+
+def format_frame_key(key):
+    '''
+    session key 的可读形式，只用于报告、日志，不参与分组
+    也接受 (code, lasti) 元组
+    '''
+    if isinstance(key, tuple):
+        try:
+            return _intern(key)
+        except (TypeError, ValueError, AttributeError):
+            pass
+    return str(key)
+
+
+def _lineno(code, lasti):
+    line = code.co_firstlineno
+    for offset, l in dis.findlinestarts(code):
+        if offset > lasti:
+            break
+        if l is not None:
+            line = l
+    return line
+
+
+_key_func = get_frame_key
+
+
+def set_session_key(func):
+    '''
+    替换 session key 策略
+    func 在 n_class 的 __new__ 包装中被无参调用，返回可哈希的值；
+    如需旧的完整调用栈行为可传入 n_property.get_frame_chain_id
+    '''
+    global _key_func
+    _key_func = func if func is not None else get_frame_key
+
+
+def get_session_key():
+    return _key_func
+
+
+_stack = ContextVar('n_property_session_stack', default=())
+
+
+class n_session(object):
+    '''
+    显式指定一批对象，代替按调用栈分组
+
+        with n_session():
+            reviews = [Review(i) for i in ids]
+
+        @n_session
+        def load_reviews(ids): ...
+
+    作用域内构造的 n_class 对象不再检查调用栈，全部（按类）属于同一个 session，
+    作用域结束后分组依然有效；n_property/n_method 第一次访问即对整个 session 批量获取
+    当前 session 保存在 contextvars 中，不同线程、不同 asyncio task 互不影响
+    '''
+    site = None  # 报告中的调用位置，None 时为 session 本身
+
+    def __new__(cls, func=None):
+        if func is None:
+            self = object.__new__(cls)
+            self._tokens = []
+            return self
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with cls():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def __call__(self, func):
+        return n_session(func)
+
+    def __enter__(self):
+        self._tokens.append(_stack.set(_stack.get() + (self,)))
+        return self
+
+    def __exit__(self, *exc_info):
+        _stack.reset(self._tokens.pop())
+
+    def __repr__(self):
+        return '<n_session 0x%x>' % id(self)
+
+
+def current_session():
+    stack = _stack.get()
+    return stack[-1] if stack else None
+
+
+def batch_session(name):
+    '''
+    批量获取方法中使用的 n_session，其中构造的对象在统计、分析报告中以 n_property/n_method 的名字为调用位置，
+    每一批不再各占一个位置
+    '''
+    session = n_session()
+    session.site = name
+    return session
+
+
+def report_site(frame_id):
+    '''
+    统计、分析报告中使用的调用位置
+    '''
+    if isinstance(frame_id, n_session) and frame_id.site is not None:
+        return frame_id.site
+    return frame_id
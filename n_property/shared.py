@@ -0,0 +1,255 @@
+# encoding: utf-8
+'''
+多进程共用的批量结果缓存，基于 mmap，不依赖外部服务
+
+    cache = SharedMemoryCache(sets=4096, ways=8, slot_size=512, ttl=60)  # 在 fork 之前创建
+
+    subject = n_property(fallback=None, cache=cache, key=lambda r: r.subject_id)
+
+prefork 的各个 worker 共用同一块内存：一个进程获取的结果，其他进程直接命中。
+不传 path 时使用匿名的临时文件（/dev/shm），需要在 fork 之前创建；
+传入 path 时任何打开同一文件（参数一致）的进程都可以共用；
+结果以 pickle 读取，文件必须属于当前用户且其他用户不可读写，否则抛出 NError。
+
+- 组相联哈希表：key 决定所在的组（sets 个），每组 ways 个固定大小（slot_size）的槽，
+  组满时淘汰组内最久未使用的结果（近似 LRU），ttl（秒）过期
+- key 与结果以 pickle 保存，超过槽大小或不能 pickle 的结果不缓存（oversize 计数）；
+  不能读取的结果（写入中途进程退出、类已改名等）按未命中处理并清空该槽
+- 读写分别使用 fcntl 共享锁、排他锁，进程内再加一把线程锁；只支持 Unix
+'''
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .cache import Cache
+from .utils import NError
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+MAGIC = b'NPSHM001'
+HEADER = struct.Struct('<8sIIIQ')  # magic, sets, ways, slot_size, tick
+HEADER_SIZE = 64
+TICK_OFFSET = struct.calcsize('<8sIII')
+SLOT = struct.Struct('<QdQII')  # key hash, expires, tick, key 长度（0 为空槽）, 结果长度
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+class SharedMemoryCache(Cache):
+
+    def __init__(self, sets=4096, ways=8, slot_size=512, ttl=None, path=None):
+        if fcntl is None:
+            raise NError('SharedMemoryCache requires fcntl !!!')
+        if slot_size <= SLOT.size:
+            raise NError('Please use slot_size larger than %d !!!' % SLOT.size)
+
+        self.sets = sets
+        self.ways = ways
+        self.slot_size = slot_size
+        self.ttl = ttl
+        self.size = HEADER_SIZE + sets * ways * slot_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversize = 0
+        self._lock = threading.Lock()
+
+        if path is None:
+            tmp = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            fd, path = tempfile.mkstemp(prefix='n_property_', dir=tmp)
+            os.unlink(path)  # fork 出的子进程继承 fd 与映射
+        else:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                _check_owner(fd, path)
+            except NError:
+                os.close(fd)
+                raise
+        self.path = path
+        self._fd = fd
+
+        self._locked(fcntl.LOCK_EX, self._init_file)
+        self._mem = mmap.mmap(fd, self.size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+
+    def _init_file(self):
+        header = os.read(self._fd, HEADER.size) if os.fstat(self._fd).st_size >= HEADER.size else b''
+        if header:
+            magic, sets, ways, slot_size, _ = HEADER.unpack(header)
+            if (magic, sets, ways, slot_size) != (MAGIC, self.sets, self.ways, self.slot_size):
+                raise NError('Shared cache %s was created with other parameters !!!' % self.path)
+            return
+        os.ftruncate(self._fd, self.size)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, HEADER.pack(MAGIC, self.sets, self.ways, self.slot_size, 0))
+
+    def _locked(self, mode, func, *args):
+        with self._lock:
+            fcntl.lockf(self._fd, mode)
+            try:
+                return func(*args)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _tick(self):
+        '''
+        全局递增计数，用于 LRU；并发读时可能重复，只影响淘汰的先后
+        '''
+        mem = self._mem
+        tick = struct.unpack_from('<Q', mem, TICK_OFFSET)[0] + 1
+        struct.pack_into('<Q', mem, TICK_OFFSET, tick)
+        return tick
+
+    def _slots(self, h):
+        base = HEADER_SIZE + (h % self.sets) * self.ways * self.slot_size
+        return range(base, base + self.ways * self.slot_size, self.slot_size)
+
+    def _find(self, h, kb, now):
+        mem = self._mem
+        for offset in self._slots(h):
+            slot_hash, expires, _, key_len, val_len = SLOT.unpack_from(mem, offset)
+            if not key_len or slot_hash != h:
+                continue
+            start = offset + SLOT.size
+            if mem[start:start + key_len] != kb:
+                continue
+            if expires and expires < now:
+                return None, None
+            return offset, mem[start + key_len:start + key_len + val_len]
+        return None, None
+
+    def get_many(self, keys):
+        return self._locked(fcntl.LOCK_SH, self._get_many, keys)
+
+    def _get_many(self, keys):
+        found = {}
+        now = time.time()
+        mem = self._mem
+        for key in keys:
+            kb, h = _dump_key(key)
+            offset, vb = self._find(h, kb, now)
+            if offset is None:
+                self.misses += 1
+                continue
+            try:
+                value = pickle.loads(vb)
+            except Exception:  # 不完整或过时的结果
+                SLOT.pack_into(mem, offset, 0, 0.0, 0, 0, 0)
+                self.misses += 1
+                continue
+            struct.pack_into('<Q', mem, offset + 16, self._tick())
+            found[key] = value
+            self.hits += 1
+        return found
+
+    def set_many(self, mapping):
+        items = []
+        for key, value in mapping.items():
+            kb, h = _dump_key(key)
+            try:
+                vb = pickle.dumps(value, PROTOCOL)
+            except Exception:  # 不能 pickle 的结果不缓存
+                self.oversize += 1
+                continue
+            if SLOT.size + len(kb) + len(vb) > self.slot_size:
+                self.oversize += 1
+                continue
+            items.append((h, kb, vb))
+        if items:
+            self._locked(fcntl.LOCK_EX, self._set_many, items)
+
+    def _set_many(self, items):
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else 0.0
+        mem = self._mem
+        for h, kb, vb in items:
+            offset, _ = self._find(h, kb, 0)
+            if offset is None:
+                offset = self._victim(h, now)
+            start = offset + SLOT.size
+            mem[start:start + len(kb) + len(vb)] = kb + vb
+            SLOT.pack_into(mem, offset, h, expires, self._tick(), len(kb), len(vb))
+
+    def _victim(self, h, now):
+        '''
+        组内的空槽、已过期的槽，否则最久未使用的槽
+        '''
+        oldest, oldest_tick = None, None
+        for offset in self._slots(h):
+            _, expires, tick, key_len, _ = SLOT.unpack_from(self._mem, offset)
+            if not key_len or (expires and expires < now):
+                return offset
+            if oldest is None or tick < oldest_tick:
+                oldest, oldest_tick = offset, tick
+        self.evictions += 1
+        return oldest
+
+    def delete_many(self, keys):
+        self._locked(fcntl.LOCK_EX, self._delete_many, [_dump_key(key) for key in keys])
+
+    def _delete_many(self, items):
+        for kb, h in items:
+            offset, _ = self._find(h, kb, 0)
+            if offset is not None:
+                SLOT.pack_into(self._mem, offset, 0, 0.0, 0, 0, 0)
+
+    def clear(self):
+        def clear():
+            empty = SLOT.pack(0, 0.0, 0, 0, 0)
+            for offset in range(HEADER_SIZE, self.size, self.slot_size):
+                self._mem[offset:offset + SLOT.size] = empty
+        self._locked(fcntl.LOCK_EX, clear)
+
+    def __len__(self):
+        def count():
+            return sum(
+                1 for offset in range(HEADER_SIZE, self.size, self.slot_size)
+                if SLOT.unpack_from(self._mem, offset)[3]
+            )
+        return self._locked(fcntl.LOCK_SH, count)
+
+    def close(self):
+        self._mem.close()
+        os.close(self._fd)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self),
+            'capacity': self.sets * self.ways,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'oversize': self.oversize,
+            'hit_rate': float(self.hits) / total if total else 0.0,
+        }
+
+
+def _check_owner(fd, path):
+    '''
+    其他用户创建或可写的文件中的 pickle 可能在 loads 时执行任意代码
+    '''
+    st = os.fstat(fd)
+    if st.st_uid != os.geteuid():
+        raise NError('Shared cache %s is not owned by the current user !!!' % path)
+    if st.st_mode & 0o077:
+        raise NError('Shared cache %s is accessible by other users !!!' % path)
+
+
+def _dump_key(key):
+    '''
+    key 的 pickle 与稳定的哈希（不受 PYTHONHASHSEED 影响）
+    '''
+    kb = pickle.dumps(key, PROTOCOL)
+    return kb, struct.unpack('<Q', hashlib.md5(kb).digest()[:8])[0]
@@ -0,0 +1,74 @@
+# encoding: utf-8
+'''
+对象上保存 n_property 结果、session key、n_method 缓存的位置
+
+有 __dict__ 的对象直接使用 __dict__（n_property 的结果会替换掉 property，之后访问没有额外开销）；
+使用 __slots__ 的类可以在 __slots__ 中声明 _nc_state，否则保存在以 id 为 key 的旁路表中，
+对象被回收时通过 weakref 回调删除。
+n_method 的结果与绑定对象总是保存在旁路表中，不属于对象自身的状态（不会被 pickle、copy，也不出现在 vars 中）。
+session 需要对象的 weakref，使用 __slots__ 的类必须声明 __weakref__。
+'''
+import weakref
+
+
+_side = {}
+
+
+class _StateRef(weakref.ref):
+    __slots__ = ('key',)
+
+
+def _discard(ref):
+    _side.pop(ref.key, None)
+
+
+def state_of(obj):
+    state = getattr(obj, '__dict__', None)
+    if state is not None:
+        return state
+    state = getattr(obj, '_nc_state', None)
+    if state is not None:
+        return state
+    if hasattr(type(obj), '_nc_state'):  # __slots__ 中声明了 _nc_state
+        state = {}
+        object.__setattr__(obj, '_nc_state', state)
+        return state
+    return side_state(obj)
+
+
+def side_state(obj):
+    '''
+    旁路表中 obj 的 state，没有 __dict__ 与 _nc_state 的对象与 state_of 相同
+    '''
+    try:
+        return _side[id(obj)]
+    except KeyError:
+        return _new_state(obj)
+
+
+def _new_state(obj):
+    # weakref 保存在 state 中，回调在对象释放时（id 被复用之前）执行
+    ref = _StateRef(obj, _discard)
+    ref.key = id(obj)
+    return _side.setdefault(ref.key, {'_nc_ref': ref})
+
+
+def frame_id_of(obj):
+    '''
+    对象的 session key；有 __dict__ 的对象以普通属性保存，读写都不会生成 __dict__
+    '''
+    try:
+        return obj._nc_frame_id
+    except AttributeError:
+        return state_of(obj).get('_nc_frame_id')
+
+
+def set_frame_id(obj, frame_id):
+    try:
+        object.__setattr__(obj, '_nc_frame_id', frame_id)
+    except AttributeError:  # 没有 __dict__ 的对象
+        state_of(obj)['_nc_frame_id'] = frame_id
+
+
+def supports_weakref(cls):
+    return getattr(cls, '__weakrefoffset__', 1) != 0
@@ -1,6 +1,10 @@
 # -*- coding=utf-8 -*-
 
 
+class NError(Exception):
+    pass
+
+
 class HashableDict(dict):
     def __init__(self, *args, **kwargs):
         super(HashableDict, self).__init__(*args, **kwargs)
@@ -20,3 +24,73 @@ class HashableList(list):
         return hash(tuple(self))
 
 
+_list_mark = object()
+_dict_mark = object()
+_set_mark = object()
+
+
+def freeze(value):
+    '''
+    把 value 中的 list/dict/set（包括嵌套在 tuple 中的）转为可哈希的元组，
+    以标记区分 list 与 tuple；其他不可哈希的值保持不变，哈希时仍抛出 TypeError
+    '''
+    t = type(value)
+    if t is list or t is HashableList:
+        return (_list_mark,) + tuple(map(freeze, value))
+    if t is dict or t is HashableDict:
+        return (_dict_mark,) + tuple(sorted(zip(value, map(freeze, value.values()))))
+    if t is tuple:
+        return tuple(map(freeze, value))
+    if t is set:
+        return _set_mark, frozenset(value)
+    return value
+
+
+try:
+    from contextvars import ContextVar, copy_context
+except ImportError:  # Python < 3.7
+    import threading
+
+    copy_context = None
+
+    class ContextVar(object):
+        '''
+        没有 contextvars 时退化为线程局部变量，只实现用到的 get/set/reset
+        '''
+
+        def __init__(self, name, default=None):
+            self.name = name
+            self._default = default
+            self._local = threading.local()
+
+        def get(self):
+            return getattr(self._local, 'value', self._default)
+
+        def set(self, value):
+            token = self.get()
+            self._local.value = value
+            return token
+
+        def reset(self, token):
+            self._local.value = token
+
+
+def run_batches(func, items, max_batch=None, executor=None):
+    '''
+    按 max_batch 把 items 分块调用 func(chunk)，结果按顺序拼接
+    提供 executor（如 concurrent.futures.ThreadPoolExecutor）时各块并发执行
+    '''
+    if not max_batch or len(items) <= max_batch:
+        return func(items)
+
+    chunks = [items[i:i + max_batch] for i in range(0, len(items), max_batch)]
+    if executor is None:
+        results = map(func, chunks)
+    else:
+        from .registry import in_context  # registry 依赖本模块
+        results = executor.map(in_context(func), chunks)
+
+    res = []
+    for r in results:
+        res.extend(r)
+    return res
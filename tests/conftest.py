@@ -0,0 +1,7 @@
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_aio.py')
+if sys.version_info < (3,):  # async def 与 concurrent.futures
+    collect_ignore.extend(['test_isolation_py3.py', 'test_max_batch_py3.py'])
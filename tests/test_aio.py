@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from n_property import n_class, async_n_property, async_n_method, call_many
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    def __repr__(self):
+        return 'NC(a=%s)' % self.a
+
+    @async_n_property
+    async def p(selfs):
+        return await Called.gets([self.a for self in selfs])
+
+    q = async_n_property(fallback=-1)
+
+    @q.n_getter
+    @classmethod
+    async def get_qs(cls, insts):
+        return await Called.gets([0])
+
+    @async_n_method(implement='get_rs')
+    async def r(self, incr):
+        return -1
+
+    @classmethod
+    async def get_rs(cls, insts, incr):
+        return await Called.gets([self.a + incr for self in insts])
+
+
+class AsyncTestCase(unittest.TestCase):
+
+    def test_async_n_property(self):
+        async def main():
+            ncs = [NC(i) for i in range(10)]
+            ps = await asyncio.gather(*[nc.p for nc in ncs])
+            self.assertEqual(ps, list(range(10)))
+            self.assertEqual(Called.call_count, 1)
+
+            self.assertEqual(await ncs[3].p, 3)
+            self.assertEqual(await ncs[3].p, 3)
+            self.assertEqual(Called.call_count, 1)
+
+            qs = [await nc.q for nc in ncs]
+            self.assertEqual(qs, [-1] * 10)
+            self.assertEqual(Called.call_count, 2)
+
+        Called.call_count = 0
+        asyncio.run(main())
+
+    def test_coalesce(self):
+        '''
+        多个 task 同时访问同一批对象，只发起一次请求
+        '''
+        async def main():
+            ncs = [NC(i) for i in range(10)]
+
+            async def task(nc):
+                return await nc.p
+
+            ps = await asyncio.gather(*[task(nc) for nc in ncs])
+            self.assertEqual(ps, list(range(10)))
+            self.assertEqual(Called.call_count, 1)
+
+            rs = await asyncio.gather(*[nc.r(1) for nc in ncs] + [nc.r(2) for nc in ncs])
+            self.assertEqual(rs, list(range(1, 11)) + list(range(2, 12)))
+            self.assertEqual(Called.call_count, 3)
+
+            self.assertEqual(await ncs[0].r(1), 1)
+            self.assertEqual(Called.call_count, 3)
+
+        Called.call_count = 0
+        asyncio.run(main())
+
+    def test_cancel(self):
+        '''
+        取消其中一个等待的 task，其他 task 仍得到结果
+        '''
+        async def _await(awaitable):
+            return await awaitable
+
+        async def main():
+            ncs = [NC(i) for i in range(3)]
+            tasks = [asyncio.ensure_future(_await(nc.p)) for nc in ncs]
+            await asyncio.sleep(0)
+            tasks[0].cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await tasks[0]
+            self.assertEqual(await asyncio.gather(*tasks[1:]), [1, 2])
+            self.assertEqual(await ncs[0].p, 0)
+            self.assertEqual(Called.call_count, 1)
+
+        Called.call_count = 0
+        asyncio.run(main())
+
+    def test_error(self):
+        async def main():
+            ncs = [NC(i) for i in range(3)]
+            Called.error = True
+            with self.assertRaises(ValueError):
+                await ncs[0].p
+            Called.error = False
+            self.assertEqual(await ncs[1].p, 1)
+
+        Called.call_count = 0
+        asyncio.run(main())
+
+    def test_call_many(self):
+        async def main():
+            ncs = [NC(i) for i in range(10)]
+            rs = await call_many(ncs, 'r', [(i % 2,) for i in range(10)])
+            self.assertEqual(rs, [i + i % 2 for i in range(10)])
+            self.assertEqual(Called.call_count, 2)
+            self.assertEqual(await ncs[3].r(1), 4)
+            self.assertEqual(await call_many(ncs[:2], 'r', [(0,), (1,)]), [0, 2])
+            self.assertEqual(Called.call_count, 2)
+
+        Called.call_count = 0
+        asyncio.run(main())
+
+
+class Called(object):
+    call_count = 0
+    error = False
+
+    @classmethod
+    async def gets(cls, ids):
+        await asyncio.sleep(0)
+        cls.call_count += 1
+        if cls.error:
+            raise ValueError()
+        return ids
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+from n_property import n_class, n_property, LRUCache, NError
+
+
+cache = LRUCache(maxsize=100)
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    p = n_property(fallback=-1, cache=cache, key=lambda inst: inst.a)
+
+    @p.n_getter
+    @classmethod
+    def get_ps(cls, insts):
+        return Called.gets([self.a for self in insts])
+
+    q = n_property(fallback=-1, cache=cache, key=lambda inst: inst.a)
+
+    @q.n_getter
+    @classmethod
+    def get_qs(cls, insts):
+        ids = Called.gets([self.a for self in insts])
+        return [] if len(ids) > 1 else ids
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+        cache.clear()
+
+    def test_cache(self):
+        ncs = [NC(i) for i in range(10)]
+        [nc.p for nc in ncs]
+        self.assertEqual(Called.calls, [[0], list(range(1, 10))])
+
+        '''
+        新的一批对象只获取未命中的部分，结果按顺序合并
+        '''
+        ncs = [NC(i) for i in range(5, 15)]
+        ncs[0].p
+        ps = [nc.p for nc in ncs]
+        self.assertEqual(ps, list(range(5, 15)))
+        self.assertEqual(Called.calls[2:], [list(range(10, 15))])
+        self.assertEqual(NC.p.cache_hits, 5)
+        self.assertEqual(NC.p.cache_misses, 15)
+        self.assertEqual(cache.stats()['size'], 15)
+
+        '''
+        不同的 n_property 互不影响；数量不一致的结果不缓存
+        '''
+        ncs = [NC(i) for i in range(3)]
+        self.assertEqual([nc.q for nc in ncs], [0, -1, -1])
+        ncs = [NC(i) for i in range(3)]
+        self.assertEqual(ncs[1].q, 1)
+        self.assertEqual(ncs[0].q, 0)
+
+        with self.assertRaises(NError):
+            n_property(cache=cache)
+
+    def test_lru(self):
+        c = LRUCache(maxsize=2, ttl=0.05)
+        c.set_many({1: 1, 2: 2})
+        self.assertEqual(c.get_many([1, 3]), {1: 1})
+        c.set_many({3: 3})
+        self.assertEqual(c.get_many([1, 2, 3]), {1: 1, 3: 3})
+        self.assertEqual(c.evictions, 1)
+        time.sleep(0.06)
+        self.assertEqual(c.get_many([1, 3]), {})
+        self.assertEqual(c.stats()['hits'], 3)
+
+
+class Called(object):
+    calls = []
+
+    @classmethod
+    def gets(cls, ids):
+        cls.calls.append(ids)
+        return ids
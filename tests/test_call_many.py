@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import n_class, n_method, call_many, NError, MISSING
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_method(implement='get_ps')
+    def p(self, incr):
+        return -1
+
+    @classmethod
+    def get_ps(cls, insts, incr):
+        return Called.gets([self.a + incr for self in insts])
+
+    @n_method(implement='get_vs', vectorized=True)
+    def v(self, incr, scale=1):
+        return -1
+
+    @classmethod
+    def get_vs(cls, insts, calls):
+        return Called.gets([
+            (self.a + args[0]) * kwargs.get('scale', 1) if self.a != 3 else MISSING
+            for self, (args, kwargs) in zip(insts, calls)
+        ])
+
+
+class CallManyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+
+    def test_grouped(self):
+        SAMPLE = list(range(20))
+        ncs = [NC(i) for i in SAMPLE]
+
+        '''
+        相同参数的调用合并，结果写入缓存
+        '''
+        ps = call_many(ncs, 'p', [(i % 3,) for i in SAMPLE])
+        self.assertEqual(ps, [i + i % 3 for i in SAMPLE])
+        self.assertEqual(len(Called.calls), 3)
+
+        self.assertEqual([nc.p(i % 3) for nc, i in zip(ncs, SAMPLE)], ps)
+        self.assertEqual(call_many(ncs[:2], 'p', [(0,), (1,)]), [0, 2])
+        self.assertEqual(len(Called.calls), 3)
+
+        with self.assertRaises(NError):
+            call_many(ncs, 'p', [(0,)])
+        with self.assertRaises(NError):
+            call_many(ncs, 'a')
+
+    def test_vectorized(self):
+        SAMPLE = list(range(20))
+        ncs = [NC(i) for i in SAMPLE]
+
+        vs = call_many(ncs, 'v', [(i,) for i in SAMPLE], [{'scale': 2}] * 20)
+        self.assertEqual(vs, [(i + i) * 2 if i != 3 else -1 for i in SAMPLE])
+        self.assertEqual(len(Called.calls), 1)
+        self.assertEqual(ncs[5].v(5, scale=2), 20)
+
+        '''
+        普通调用时同一批对象使用相同参数
+        '''
+        self.assertEqual([nc.v(1) for nc in ncs], [i + 1 if i != 3 else -1 for i in SAMPLE])
+        self.assertEqual(len(Called.calls), 3)
+
+        '''
+        同一个对象、同一参数只获取一次
+        '''
+        self.assertEqual(call_many([ncs[0], ncs[0]], 'v', [(7,), (7,)]), [7, 7])
+        self.assertEqual(Called.calls[-1], [7])
+
+
+class Called(object):
+    calls = []
+
+    @classmethod
+    def gets(cls, ids):
+        cls.calls.append(ids)
+        return ids
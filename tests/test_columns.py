@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import unittest
+from array import array
+from functools import partial
+from n_property import n_class, n_property, NError
+
+
+@n_class
+class NC(object):
+    def __init__(self, a, b=0):
+        self.a = a
+        self.b = b
+
+    @n_property(columns=('a',))
+    def p(ids):
+        Called.calls.append(ids)
+        return [i * 10 for i in ids]
+
+    q = n_property(fallback=-1, columns=('a', 'b'))
+
+    @q.n_getter
+    @classmethod
+    def get_qs(cls, ids, bs):
+        Called.calls.append((ids, bs))
+        return dict(((i, b), i + b) for i, b in zip(ids, bs) if i != 3)
+
+    @n_property(columns=('a',), column_type=partial(array, 'q'))
+    def r(ids):
+        Called.calls.append(ids)
+        return [i for i in ids]
+
+
+class ColumnsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+
+    def test_columns(self):
+        ncs = [NC(i % 3) for i in range(10)]
+        ncs[0].p
+        ps = [nc.p for nc in ncs]
+        self.assertEqual(ps, [(i % 3) * 10 for i in range(10)])
+        self.assertEqual(Called.calls, [[0], [1, 2, 0]])
+
+    def test_mapping(self):
+        ncs = [NC(i % 5, 1) for i in range(10)]
+        ncs[0].q
+        qs = [nc.q for nc in ncs]
+        self.assertEqual(qs, [1, 2, 3, -1, 5] * 2)
+        self.assertEqual(Called.calls[1], ([1, 2, 3, 4, 0], [1, 1, 1, 1, 1]))
+
+    def test_column_type(self):
+        ncs = [NC(i) for i in range(4)]
+        ncs[0].r
+        self.assertEqual([nc.r for nc in ncs], list(range(4)))
+        self.assertEqual(Called.calls[1], array('q', [1, 2, 3]))
+
+        with self.assertRaises(NError):
+            n_property(columns=('a',), column_type='tensor')
+
+    def test_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest('numpy is not installed')
+
+        @n_class
+        class NP(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_property(columns=('a',), column_type='numpy', prefetch='eager')
+            def p(ids):
+                return ids * 2
+
+        self.assertEqual([nc.p for nc in [NP(i) for i in range(3)]], [0, 2, 4])
+
+
+class Called(object):
+    calls = []
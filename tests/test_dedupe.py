@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import n_class, n_property, NError
+
+
+@n_class
+class Review(object):
+    def __init__(self, subject_id):
+        self.subject_id = subject_id
+
+    subject = n_property(fallback=None, key=lambda r: r.subject_id, dedupe=True)
+
+    @subject.n_getter
+    @classmethod
+    def get_subjects(cls, insts):
+        ids = [inst.subject_id for inst in insts]
+        Called.calls.append(ids)
+        return ['subject%s' % i for i in ids]
+
+
+class DedupeTestCase(unittest.TestCase):
+
+    def test_dedupe(self):
+        Called.calls = []
+        reviews = [Review(i % 4) for i in range(21)]
+        reviews[0].subject
+        subjects = [r.subject for r in reviews]
+        self.assertEqual(subjects, ['subject%s' % (i % 4) for i in range(21)])
+        self.assertEqual(Called.calls, [[0], [1, 2, 3, 0]])
+
+        stats = Review.subject.stats()
+        self.assertEqual(stats['dedup_insts'], 21)
+        self.assertEqual(stats['dedup_keys'], 5)
+        self.assertAlmostEqual(Review.subject.dedup_ratio, 1 - 5 / 21.0)
+
+        with self.assertRaises(NError):
+            n_property(dedupe=True)
+
+    def test_unhashable(self):
+        '''
+        key 不可哈希时按 == 去重，保持第一次出现的顺序
+        '''
+        Called.calls = []
+        tags = [Tag([i % 3, 9 - i % 3]) for i in range(8)]
+        self.assertEqual([t.name for t in tags], ['tag%s' % (i % 3) for i in range(8)])
+        self.assertEqual(Called.calls, [[[0, 9]], [[1, 8], [2, 7], [0, 9]]])
+
+
+@n_class
+class Tag(object):
+    def __init__(self, ids):
+        self.ids = ids
+
+    name = n_property(fallback=None, key=lambda t: t.ids, dedupe=True)
+
+    @name.n_getter
+    @classmethod
+    def get_names(cls, insts):
+        ids = [inst.ids for inst in insts]
+        Called.calls.append(ids)
+        return ['tag%s' % i[0] for i in ids]
+
+
+class Called(object):
+    calls = []
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import n_class, n_property, n_method, n_deferred, flush, resolve, Lazy
+
+
+@n_class
+class Author(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def name(selfs):
+        return Called.gets(['author%s' % self.a for self in selfs])
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return Called.gets([self.a for self in selfs])
+
+    @n_property
+    def author(selfs):
+        Called.gets([self.a for self in selfs])
+        return [Author(self.a) for self in selfs]
+
+    @n_method('get_ms')
+    def m(self, incr):
+        return -1
+
+    @classmethod
+    def get_ms(cls, insts, incr):
+        return Called.gets([self.a + incr for self in insts])
+
+
+def serialize(nc):
+    return {'p': nc.p, 'm': nc.m(nc.a % 2), 'author': nc.author}
+
+
+class DeferredTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+
+    def test_deferred(self):
+        ncs = [NC(i) for i in range(10)]
+        with n_deferred():
+            data = [serialize(nc) for nc in reversed(ncs)]
+            self.assertIsInstance(data[0]['p'], Lazy)
+            self.assertEqual(Called.calls, [])
+        '''
+        作用域结束时每个 n_property 调用一次，n_method 按参数分组
+        '''
+        self.assertEqual(len(Called.calls), 4)
+        data = resolve(data)
+        self.assertEqual([d['p'] for d in data], list(range(9, -1, -1)))
+        self.assertEqual([d['m'] for d in data], [i + i % 2 for i in range(9, -1, -1)])
+        self.assertEqual(data[0]['author'].a, 9)
+
+        '''
+        已获取的结果直接返回
+        '''
+        with n_deferred():
+            self.assertEqual(ncs[0].p, 0)
+            self.assertNotIsInstance(ncs[0].p, Lazy)
+        self.assertEqual(len(Called.calls), 4)
+
+    def test_flush(self):
+        ncs = [NC(i) for i in range(5)]
+        with n_deferred():
+            authors = [nc.author for nc in ncs]
+            flush()
+            self.assertEqual(len(Called.calls), 1)
+            names = [author.name for author in authors]
+            self.assertIsInstance(names[0], Lazy)
+            self.assertEqual(len(Called.calls), 1)
+            flush()
+            self.assertEqual(len(Called.calls), 2)
+            self.assertEqual(names, ['author%s' % i for i in range(5)])
+
+            ps = [nc.p for nc in ncs]
+            self.assertEqual(sum(ps[1:], ps[0]), 10)
+            self.assertEqual(len(Called.calls), 3)
+            self.assertEqual(sorted(ps, reverse=True)[0], 4)
+            self.assertEqual(repr(ps[0]), '0')
+
+            '''
+            使用未解析的占位对象时先 flush 全部请求
+            '''
+            ncs = [NC(i) for i in range(5)]
+            ps = [nc.p for nc in ncs]
+            self.assertEqual(ps[2] + 1, 3)
+            self.assertEqual(Called.calls[-1], [0, 1, 2, 3, 4])
+
+
+class Called(object):
+    calls = []
+
+    @classmethod
+    def gets(cls, ids):
+        cls.calls.append(ids)
+        return ids
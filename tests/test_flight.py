@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+from n_property import n_class, n_property, n_method, prefetch
+
+
+started = threading.Event()
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    p = n_property(fallback=-1, key=lambda inst: inst.a, single_flight=True)
+
+    @p.n_getter
+    @classmethod
+    def get_ps(cls, insts):
+        return Called.gets([self.a for self in insts])
+
+    @n_method('get_ms', single_flight=True)
+    def m(self, incr):
+        return -1
+
+    @classmethod
+    def get_ms(cls, insts, incr):
+        return Called.gets([self.a + incr for self in insts])
+
+
+def run(*funcs):
+    threads = [threading.Thread(target=func) for func in funcs]
+    threads[0].start()
+    started.wait(1)
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+        Called.error = False
+        started.clear()
+
+    def test_overlap(self):
+        '''
+        部分重叠的两批对象，只获取对方没有在获取的 key
+        '''
+        res = {}
+
+        def fetch(name, ids):
+            def func():
+                ncs = [NC(i) for i in ids]
+                prefetch(ncs, 'p')
+                res[name] = [nc.p for nc in ncs]
+            return func
+
+        run(fetch('a', range(5)), fetch('b', range(3, 8)))
+        self.assertEqual(res, {'a': list(range(5)), 'b': list(range(3, 8))})
+        self.assertEqual(sorted(Called.calls), [[0, 1, 2, 3, 4], [5, 6, 7]])
+        self.assertEqual(NC.p.flights.shared, 2)
+        self.assertEqual(len(NC.p.flights), 0)
+
+    def test_same_objects(self):
+        '''
+        第二个线程批量获取时，第一个线程正在获取的对象等待其结果
+        '''
+        ncs = [NC(i) for i in range(5)]
+        res = []
+
+        def first():
+            res.append(ncs[0].m(1))
+
+        def second():
+            res.append(ncs[0].m(1))
+            res.append([nc.m(1) for nc in ncs])
+
+        run(first, second)
+        self.assertEqual(res, [1, 1, list(range(1, 6))])
+        # 只断言每个 key 只取一次，不断言如何分批（与线程调度有关）
+        self.assertEqual(sorted(i for ids in Called.calls for i in ids), [1, 2, 3, 4, 5])
+        self.assertEqual(NC.__dict__['m'].flights.shared, 1)
+
+    def test_error(self):
+        res = []
+
+        def fail():
+            Called.error = True
+            try:
+                prefetch([NC(i) for i in range(3)], 'p')
+            except ValueError:
+                res.append('error')
+
+        def ok():
+            Called.error = False
+            ncs = [NC(i) for i in range(3)]
+            prefetch(ncs, 'p')
+            res.append([nc.p for nc in ncs])
+
+        run(fail, ok)
+        self.assertEqual(sorted(res, key=str), [[0, 1, 2], 'error'])
+
+
+class Called(object):
+    calls = []
+    error = False
+
+    @classmethod
+    def gets(cls, ids):
+        error = cls.error
+        started.set()
+        time.sleep(0.05)
+        if error:
+            raise ValueError()
+        cls.calls.append(ids)
+        return ids
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+from n_property import (
+    n_class, n_property, n_method, LRUCache, NError,
+    invalidate, invalidate_session, refresh,
+)
+
+
+cache = LRUCache(maxsize=100)
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    p = n_property(fallback=-1)
+
+    @p.n_getter
+    @classmethod
+    def get_ps(cls, insts):
+        return Called.gets([self.a * Called.version for self in insts])
+
+    q = n_property(fallback=-1, cache=cache, key=lambda inst: inst.a)
+
+    @q.n_getter
+    @classmethod
+    def get_qs(cls, insts):
+        return Called.gets([self.a * Called.version for self in insts])
+
+    t = n_property(fallback=-1, ttl=0.05)
+
+    @t.n_getter
+    @classmethod
+    def get_ts(cls, insts):
+        return Called.gets([self.a * Called.version for self in insts])
+
+    @n_method('get_ms')
+    def m(self, b=0):
+        return -1
+
+    @classmethod
+    def get_ms(cls, insts, b=0):
+        return Called.gets([self.a * Called.version + b for self in insts])
+
+
+class InvalidateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+        Called.version = 1
+        cache.clear()
+
+    def test_invalidate(self):
+        ncs = [NC(i) for i in range(5)]
+        self.assertEqual([nc.p for nc in ncs], [0, 1, 2, 3, 4])
+        Called.version = 2
+
+        invalidate(ncs[1], 'p')
+        self.assertEqual([nc.p for nc in ncs], [0, 2, 2, 3, 4])
+
+        invalidate_session(ncs[1], 'p')
+        self.assertEqual(ncs[3].p, 6)
+        self.assertEqual([nc.p for nc in ncs], [0, 2, 4, 6, 8])
+        self.assertEqual(Called.calls[-1], [0, 2, 4, 6, 8])
+
+        with self.assertRaises(NError):
+            invalidate(ncs[0], 'a')
+
+    def test_method(self):
+        ncs = [NC(i) for i in range(3)]
+        bound = ncs[0].m
+        self.assertEqual([nc.m() for nc in ncs], [0, 1, 2])
+        self.assertEqual([nc.m(b=1) for nc in ncs], [1, 2, 3])
+        Called.version = 2
+
+        invalidate_session(ncs[0])
+        self.assertIs(ncs[0].m, bound)
+        self.assertEqual(bound(b=1), 1)
+        self.assertEqual([nc.m(b=1) for nc in ncs], [1, 3, 5])
+
+    def test_refresh(self):
+        ncs = [NC(i) for i in range(5)]
+        self.assertEqual([nc.q for nc in ncs], [0, 1, 2, 3, 4])
+        Called.version = 2
+        Called.calls = []
+
+        '''
+        跨请求缓存中的结果一并删除，整批对象只调用一次
+        '''
+        refresh(ncs, 'q')
+        self.assertEqual(Called.calls, [[0, 2, 4, 6, 8]])
+        self.assertEqual([nc.q for nc in ncs], [0, 2, 4, 6, 8])
+        self.assertEqual(len(Called.calls), 1)
+
+        refresh(ncs[1:3])
+        self.assertEqual([nc.p for nc in ncs[1:3]], [2, 4])
+        self.assertEqual(len(Called.calls), 4)
+
+    def test_ttl(self):
+        ncs = [NC(i) for i in range(5)]
+        self.assertEqual([nc.t for nc in ncs], [0, 1, 2, 3, 4])
+        self.assertEqual(len(Called.calls), 2)
+        Called.version = 2
+        self.assertEqual(ncs[2].t, 2)
+
+        time.sleep(0.06)
+        self.assertEqual([nc.t for nc in ncs], [0, 2, 4, 6, 8])
+        self.assertEqual(Called.calls[-1], [2, 4, 6, 8])
+
+        invalidate(ncs[0], 't')
+        self.assertEqual(ncs[0].t, 0)
+        self.assertEqual(Called.calls[-1], [0])
+
+
+class Called(object):
+    calls = []
+    version = 1
+
+    @classmethod
+    def gets(cls, ids):
+        cls.calls.append(ids)
+        return ids
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+from n_property import (
+    n_class, n_property, n_session, current_session, get_registry,
+    set_isolation, NError,
+)
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        Called.calls.append(len(selfs))
+        return [self.a for self in selfs]
+
+
+def make(n):
+    return [NC(i) for i in range(n)]
+
+
+def run_threads(target, n):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+
+
+class IsolationTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        set_isolation('global')
+
+    def test_concurrent_add(self):
+        '''
+        并发构造不会丢失对象
+        '''
+        keep = []
+
+        def target():
+            keep.extend(make(500))
+
+        run_threads(target, 8)
+        session = get_registry().get((NC, keep[0]._nc_frame_id))
+        self.assertEqual(len(session.members()), 4000)
+
+    def test_thread_isolation(self):
+        set_isolation('thread')
+        results = []
+
+        def target():
+            Called.calls = []
+            ncs = make(10)
+            results.append([nc.p for nc in ncs])
+            results.append(len(get_registry().get((NC, ncs[0]._nc_frame_id)).members()))
+
+        run_threads(target, 4)
+        self.assertEqual(results[1::2], [10] * 4)
+        self.assertEqual(results[0::2], [list(range(10))] * 4)
+
+        with self.assertRaises(NError):
+            set_isolation('process')
+
+    def test_limits(self):
+        '''
+        线程隔离的注册表使用全局注册表的 max_sessions，创建之后修改同样生效
+        '''
+        set_isolation('thread')
+        sessions = n_property.sessions
+        max_sessions = sessions.max_sessions
+        results = []
+
+        def target():
+            keep = [NC(0)]  # 创建线程的注册表
+            sessions.max_sessions = 2
+            keep.append(NC(1))
+            keep.append(NC(2))
+            results.append(len(get_registry()))
+
+        try:
+            run_threads(target, 1)
+        finally:
+            sessions.max_sessions = max_sessions
+        self.assertEqual(results, [2])
+
+    def test_session_per_thread(self):
+        seen = []
+
+        def target():
+            seen.append(current_session())
+
+        with n_session():
+            run_threads(target, 2)
+        self.assertEqual(seen, [None, None])
+
+
+class Called(object):
+    calls = []
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+'''
+线程池与 asyncio 相关的隔离测试，只在 Python 3 下收集（见 conftest.py）
+'''
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from n_property import n_class, n_property, n_session, get_registry, set_isolation, prefetch
+
+
+@n_class
+class Subject(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def author(selfs):
+        Called.calls.append(len(selfs))
+        return [self.a for self in selfs]
+
+
+pool = ThreadPoolExecutor(2)
+
+
+@n_class
+class Review(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def tags(selfs):
+        return [[] for self in selfs]
+
+    @n_property
+    def subject(selfs):
+        return [Subject(self.a) for self in selfs]
+
+    chunked = n_property(fallback=None, max_batch=3, executor=pool)
+
+    @chunked.n_getter
+    @classmethod
+    def get_chunkeds(cls, insts):
+        return [Subject(self.a) for self in insts]
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        Called.calls.append(len(selfs))
+        return [self.a for self in selfs]
+
+
+def make(n):
+    return [NC(i) for i in range(n)]
+
+
+class IsolationTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        set_isolation('global')
+
+    def test_executor(self):
+        '''
+        线程池中执行的批量获取方法构造的对象注册到调用方的注册表
+        '''
+        for mode in ('thread', 'context'):
+            set_isolation(mode)
+            reviews = [Review(i) for i in range(10)]
+            prefetch(reviews, 'tags', 'subject', executor=pool)
+            Called.calls = []
+            self.assertEqual([r.subject.author for r in reviews], list(range(10)))
+            self.assertEqual(Called.calls, [10])
+
+            reviews = [Review(i) for i in range(10)]
+            self.assertEqual(reviews[0].chunked.a, 0)  # 第一次只获取一个对象
+            [r.chunked for r in reviews]
+            Called.calls = []
+            self.assertEqual([r.chunked.author for r in reviews[1:]], list(range(1, 10)))
+            self.assertEqual(Called.calls, [3, 3, 3])  # 每块构造的对象各自属于一个 session
+
+    def test_context_isolation(self):
+        try:
+            import asyncio
+            import contextvars  # noqa
+        except ImportError:
+            self.skipTest('contextvars is not available')
+
+        set_isolation('context')
+
+        async def handler(n):
+            with n_session():
+                await asyncio.sleep(0)
+                ncs = make(n)
+            await asyncio.sleep(0)
+            registry = get_registry()
+            return [nc.p for nc in ncs], len(registry), registry
+
+        async def main():
+            return await asyncio.gather(*[handler(n) for n in (3, 4, 5)])
+
+        Called.calls = []
+        res = asyncio.run(main())
+        self.assertEqual([r[0] for r in res], [list(range(n)) for n in (3, 4, 5)])
+        self.assertEqual([r[1] for r in res], [1, 1, 1])
+        self.assertEqual(len(set(id(r[2]) for r in res)), 3)
+        self.assertEqual(sorted(Called.calls), [3, 4, 5])
+
+
+class Called(object):
+    calls = []
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import n_class, n_property
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property(max_batch=4)
+    def p(selfs):
+        return Called.gets([self.a for self in selfs])
+
+
+class MaxBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+
+    def test_n_property(self):
+        ncs = [NC(i) for i in range(10)]
+        ps = [nc.p for nc in ncs]
+        self.assertEqual(ps, list(range(10)))
+        self.assertEqual(Called.calls, [1, 4, 4, 1])
+
+
+class Called(object):
+    calls = []
+
+    @classmethod
+    def gets(cls, ids):
+        cls.calls.append(len(ids))
+        return ids
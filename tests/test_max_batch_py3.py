@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+'''
+线程池与 asyncio 下的 max_batch 测试，只在 Python 3 下收集（见 conftest.py）
+'''
+import asyncio
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from n_property import n_class, n_property, n_method
+
+executor = ThreadPoolExecutor(4)
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    q = n_property(fallback=-1, max_batch=4, executor=executor)
+
+    @q.n_getter
+    @classmethod
+    def get_qs(cls, insts):
+        ids = Called.gets([self.a for self in insts])
+        return [] if 5 in ids else ids  # 包含 5 的块数量不一致
+
+    @n_method(implement='get_rs', max_batch=3, executor=executor)
+    def r(self, incr):
+        return -1
+
+    @classmethod
+    def get_rs(cls, insts, incr):
+        ids = Called.gets([self.a + incr for self in insts])
+        return [] if 5 in ids else ids
+
+
+class MaxBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+
+    def test_mismatch(self):
+        ncs = [NC(i) for i in range(11)]
+        ncs[0].q
+        qs = [nc.q for nc in ncs]
+        self.assertEqual(qs, [0, 1, 2, 3, 4, -1, -1, -1, -1, 9, 10])
+        self.assertEqual(sorted(Called.calls), [1, 2, 4, 4])
+
+    def test_n_method(self):
+        ncs = [NC(i) for i in range(10)]
+        ncs[0].r(1)
+        rs = [nc.r(1) for nc in ncs]
+        self.assertEqual(rs, [1, 2, 3, 4, -1, -1, -1, 8, 9, 10])
+        self.assertEqual(sorted(Called.calls), [1, 3, 3, 3])
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'asyncio.run is not available')
+    def test_async(self):
+        from n_property import async_n_property
+
+        @n_class
+        class ANC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @async_n_property(max_batch=3)
+            async def p(selfs):
+                await asyncio.sleep(0)
+                return Called.gets([self.a for self in selfs])
+
+        async def main():
+            ncs = [ANC(i) for i in range(7)]
+            return await asyncio.gather(*[nc.p for nc in ncs])
+
+        self.assertEqual(asyncio.run(main()), list(range(7)))
+        self.assertEqual(Called.calls, [3, 3, 1])
+
+
+class Called(object):
+    calls = []
+
+    @classmethod
+    def gets(cls, ids):
+        cls.calls.append(len(ids))
+        return ids
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import (
+    n_class, n_property, n_method, LRUCache, Metrics, set_metrics, get_metrics, get_registry,
+)
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    p = n_property(fallback=-1, max_batch=4)
+
+    @p.n_getter
+    @classmethod
+    def get_ps(cls, insts):
+        return [self.a for self in insts]
+
+    q = n_property(fallback=-1, cache=LRUCache(), key=lambda inst: inst.a)
+
+    @q.n_getter
+    @classmethod
+    def get_qs(cls, insts):
+        return [self.a for self in insts]
+
+    @n_method('get_ms')
+    def m(self):
+        return -1
+
+    @classmethod
+    def get_ms(cls, insts):
+        raise ValueError
+
+    @n_property
+    def child(selfs):
+        return [NC(self.a) for self in selfs]
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        set_metrics(self.metrics)
+
+    def tearDown(self):
+        set_metrics(None)
+
+    def test_metrics(self):
+        calls = []
+        self.metrics.add_hook(
+            before=lambda name, insts: calls.append(('before', name, len(insts))),
+            after=lambda name, insts, elapsed, error: calls.append(('after', name, error)),
+        )
+        self.assertIs(get_metrics(), self.metrics)
+
+        ncs = [NC(i) for i in range(10)]
+        self.assertEqual([nc.p for nc in ncs], list(range(10)))
+
+        name = '%s.NC.p' % __name__
+        stats = self.metrics.as_dict()
+        p = stats['properties'][name]
+        self.assertEqual(p['probes'], 1)
+        self.assertEqual(p['batches'], 4)  # probe + 9 个对象分 3 块
+        self.assertEqual(p['insts'], 10)
+        self.assertEqual(p['sizes'], {1: 2, 4: 2})
+        self.assertEqual(calls[:2], [('before', name, 1), ('after', name, None)])
+        self.assertEqual(len(calls), 8)
+
+        sites = [v for k, v in stats['sites'].items() if k.startswith(name + ' @ ')]
+        self.assertEqual(len(sites), 1)
+        self.assertEqual(sites[0]['batches'], 4)
+        self.assertEqual(stats['registry']['sessions'], len(get_registry()))
+
+        '''
+        缓存命中率
+        '''
+        [nc.q for nc in ncs]
+        [nc.q for nc in [NC(i) for i in range(5)]]
+        q = self.metrics.as_dict()['properties']['%s.NC.q' % __name__]
+        self.assertEqual((q['cache_hits'], q['cache_misses']), (5, 10))
+        self.assertAlmostEqual(q['hit_rate'], 1 / 3.0)
+
+        '''
+        批量获取方法出错
+        '''
+        with self.assertRaises(ValueError):
+            ncs[0].m()
+        m = self.metrics.as_dict()['properties']['%s.NC.m' % __name__]
+        self.assertEqual((m['batches'], m['errors'], m['probes']), (1, 1, 1))
+        self.assertIsInstance(calls[-1][2], ValueError)
+
+        self.metrics.clear()
+        self.assertEqual(self.metrics.as_dict()['properties'], {})
+
+    def test_batch_site(self):
+        '''
+        批量获取方法中构造的对象以该 n_property 为调用位置，每一批不再各占一个位置
+        '''
+        for _ in range(3):
+            ncs = [NC(i) for i in range(4)]
+            [nc.child.p for nc in ncs]
+
+        name = '%s.NC.p' % __name__
+        sites = [k for k in self.metrics.as_dict()['sites'] if k.startswith(name + ' @ ')]
+        self.assertEqual(sites, ['%s @ %s.NC.child' % (name, __name__)])
+
+    def test_disabled(self):
+        set_metrics(None)
+        ncs = [NC(i) for i in range(3)]
+        [nc.p for nc in ncs]
+        self.assertEqual(self.metrics.as_dict()['properties'], {})
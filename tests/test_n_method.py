@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
+import pickle
 import unittest
-from n_property import n_class, n_method, NError
+from n_property import n_class, n_method, NError, MISSING
 
 
 class NClassTestCase(unittest.TestCase):
@@ -271,6 +272,143 @@ class NClassTestCase(unittest.TestCase):
         group_sample = [(i + 1) for i in SAMPLE for cls in (NC1, NC2)]
         self.assertEqual(ps, group_sample)
 
+    def test_n_method_args(self):
+        '''
+        无参数、关键字参数、不可哈希参数
+        '''
+
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_method(implement='get_ps')
+            def p(self, incr=0, extra=None):
+                return
+
+            @classmethod
+            def get_ps(cls, insts, incr=0, extra=None):
+                ids = [self.a for self in insts]
+                return Called.gets(ids, incr + sum((extra or {}).get('l', [])))
+
+        SAMPLE = list(range(10))
+        Called.call_count = 0
+
+        ncs = [NC(i) for i in SAMPLE]
+        [nc.p() for nc in ncs]
+        self.assertEqual(Called.call_count, 2)
+        [nc.p() for nc in ncs]
+        self.assertEqual(Called.call_count, 2)
+
+        ps = [nc.p(incr=1) for nc in ncs]
+        self.assertEqual(Called.call_count, 4)
+        self.assertEqual(ps, [nc.p(1) for nc in ncs])
+        self.assertEqual(Called.call_count, 6)
+
+        ps = [nc.p(extra={'l': [1, 2]}) for nc in ncs]
+        self.assertEqual(ps, [(i + 3) for i in SAMPLE])
+        self.assertEqual(Called.call_count, 8)
+        [nc.p(extra={'l': [1, 2]}) for nc in ncs]
+        self.assertEqual(Called.call_count, 8)
+        [nc.p(extra={'l': (1, 2)}) for nc in ncs]  # list 与 tuple 是不同的参数
+        self.assertEqual(Called.call_count, 10)
+
+    def test_n_method_fallback(self):
+        '''
+        fallback 只在需要时调用
+        '''
+
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_method(implement='get_ps')
+            def p(self):
+                Called.fallback_count += 1
+                return -1
+
+            @classmethod
+            def get_ps(cls, insts):
+                return [MISSING if self.a % 5 == 4 else self.a for self in insts]
+
+            @n_method(implement='get_ps', per_inst_fallback=True)
+            def q(self):
+                Called.fallback_count += 1
+                return -self.a
+
+        SAMPLE = list(range(10))
+        Called.fallback_count = 0
+
+        ncs = [NC(i) for i in SAMPLE]
+        ps = [nc.p() for nc in ncs]
+        self.assertEqual(ps, [0, 1, 2, 3, -1, 5, 6, 7, 8, -1])
+        self.assertEqual(Called.fallback_count, 1)
+
+        ncs = [NC(i) for i in SAMPLE]
+        ps = [nc.q() for nc in ncs]
+        self.assertEqual(ps, [0, 1, 2, 3, -4, 5, 6, 7, 8, -9])
+        self.assertEqual(Called.fallback_count, 3)
+
+    def test_n_method_bound(self):
+        '''
+        绑定对象每个实例只创建一次，copy 后重新绑定
+        '''
+        import copy
+
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_method(implement='get_ps')
+            def p(self, incr):
+                return
+
+            @classmethod
+            def get_ps(cls, insts, incr):
+                ids = [self.a for self in insts]
+                return Called.gets(ids, incr)
+
+        Called.call_count = 0
+        nc = NC(1)
+        self.assertIs(nc.p, nc.p)
+        self.assertEqual(nc.p(1), 2)
+        self.assertEqual(nc.p(1), 2)
+        self.assertEqual(Called.call_count, 1)
+
+        nc2 = copy.copy(nc)
+        self.assertIs(nc2.p.ref(), nc2)
+        self.assertIs(nc.p.ref(), nc)
+
+    def test_pickle(self):
+        '''
+        绑定对象与结果不保存在对象自身，不影响 vars 与 pickle
+        '''
+        Called.call_count = 0
+        row = Row(1)
+        row.p
+        self.assertEqual(row.p(1), 2)
+        self.assertEqual(sorted(vars(row)), ['_nc_frame_id', 'a'])
+
+        row2 = pickle.loads(pickle.dumps(row))
+        self.assertEqual(row2.p(1), 2)
+        self.assertEqual(Called.call_count, 2)
+
+
+@n_class
+class Row(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_method(implement='get_ps')
+    def p(self, incr):
+        return
+
+    @classmethod
+    def get_ps(cls, insts, incr):
+        return Called.gets([self.a for self in insts], incr)
+
 
 class Called(object):
     call_count = 0
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import n_class, n_property, n_method, n_session, current_session
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    def __repr__(self):
+        return 'NC(a=%s)' % self.a
+
+    @n_property
+    def p(selfs):
+        return Called.gets([self.a for self in selfs])
+
+    @n_method(implement='get_qs')
+    def q(self, incr):
+        return
+
+    @classmethod
+    def get_qs(cls, insts, incr):
+        return Called.gets([self.a + incr for self in insts])
+
+
+def make(i):
+    return NC(i)
+
+
+class NSessionTestCase(unittest.TestCase):
+
+    def test_n_session(self):
+        '''
+        不同位置构造的对象在同一个 session 里，第一次访问即批量获取
+        '''
+        Called.call_count = 0
+        with n_session() as session:
+            self.assertIs(current_session(), session)
+            ncs = [make(i) for i in range(10)]
+            ncs.append(NC(10))
+            ncs.append(make(11))
+        self.assertIsNone(current_session())
+
+        ps = [nc.p for nc in ncs]
+        self.assertEqual(Called.call_count, 1)
+        self.assertEqual(ps, list(range(12)))
+
+        qs = [nc.q(1) for nc in ncs]
+        self.assertEqual(Called.call_count, 2)
+        self.assertEqual(qs, list(range(1, 13)))
+
+    def test_n_session_split(self):
+        '''
+        同一位置构造的对象可以分到不同 session
+        '''
+        Called.call_count = 0
+        groups = []
+        for _ in range(3):
+            with n_session():
+                groups.append([make(i) for i in range(5)])
+
+        [nc.p for nc in groups[0]]
+        self.assertEqual(Called.call_count, 1)
+        [nc.p for nc in groups[1] + groups[2]]
+        self.assertEqual(Called.call_count, 3)
+
+    def test_n_session_decorator(self):
+        @n_session
+        def load(n):
+            self.assertIsNotNone(current_session())
+            return [make(i) for i in range(n)]
+
+        @n_session()
+        def load2(n):
+            return [make(i) for i in range(n)]
+
+        Called.call_count = 0
+        a, b = load(5), load2(5)
+        self.assertEqual(load.__name__, 'load')
+        [nc.p for nc in a + b]
+        self.assertEqual(Called.call_count, 2)
+
+
+class Called(object):
+    call_count = 0
+
+    @classmethod
+    def gets(cls, ids):
+        cls.call_count += 1
+        return ids
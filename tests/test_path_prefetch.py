@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import n_class, n_property, prefetch, NError
+
+
+@n_class
+class Author(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def name(selfs):
+        return Called.gets('name', ['author%s' % self.a for self in selfs])
+
+
+@n_class
+class Subject(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def author(selfs):
+        Called.gets('author', [self.a for self in selfs])
+        return [Author(self.a % 3) for self in selfs]
+
+    @n_property
+    def tags(selfs):
+        Called.gets('tags', [self.a for self in selfs])
+        return [[Tag(self.a), Tag(self.a + 1)] for self in selfs]
+
+
+@n_class
+class Tag(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def label(selfs):
+        return Called.gets('label', ['tag%s' % self.a for self in selfs])
+
+
+@n_class
+class Review(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def subject(selfs):
+        Called.gets('subject', [self.a for self in selfs])
+        return [make_subject(self.a) if self.a % 2 else Subject(self.a) if self.a else None for self in selfs]
+
+
+def make_subject(a):
+    return Subject(a)
+
+
+class PathPrefetchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+
+    def test_path(self):
+        reviews = [Review(i) for i in range(10)]
+        prefetch(reviews, 'subject__author__name', 'subject__tags__label')
+        names = [name for name, _ in Called.calls]  # 同一层的批量获取并发执行，顺序不确定
+        self.assertEqual(names[0], 'subject')
+        self.assertEqual(sorted(names[1:3]), ['author', 'tags'])
+        self.assertEqual(sorted(names[3:]), ['label', 'name'])
+        calls = dict(Called.calls)
+        self.assertEqual(len(calls['name']), 9)  # 每个 subject 构造一个 author
+        self.assertEqual(len(calls['label']), 18)
+
+        self.assertEqual(reviews[4].subject.author.name, 'author1')
+        self.assertEqual([t.label for t in reviews[4].subject.tags], ['tag4', 'tag5'])
+        self.assertIsNone(reviews[0].subject)
+        self.assertEqual(len(Called.calls), 5)
+
+        with self.assertRaises(NError):
+            prefetch(reviews, 'subject__a__name')
+
+    def test_propagate(self):
+        '''
+        同一次批量获取中构造的对象属于同一个 session，下一层只需一次批量获取
+        subject 在不同位置构造，按调用栈分组时会被拆开
+        '''
+        reviews = [Review(i + 1) for i in range(10)]
+        names = [r.subject.author.name for r in reviews]
+        self.assertEqual(names, ['author%s' % ((i + 1) % 3) for i in range(10)])
+        counts = {}
+        for name, _ in Called.calls:
+            counts[name] = counts.get(name, 0) + 1
+        self.assertEqual(counts, {'subject': 2, 'author': 2, 'name': 2})
+
+
+class Called(object):
+    calls = []
+
+    @classmethod
+    def gets(cls, name, ids):
+        cls.calls.append((name, ids))
+        return ids
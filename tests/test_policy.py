@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import (
+    n_class, n_property, n_method, set_prefetch_policy, NError,
+    EAGER, SECOND_ACCESS, ADAPTIVE,
+)
+from n_property.policy import adaptive
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return Called.gets([self.a for self in selfs])
+
+    @n_property(prefetch=EAGER)
+    def q(selfs):
+        return Called.gets([self.a for self in selfs])
+
+    @n_method(implement='get_rs', prefetch=EAGER)
+    def r(self):
+        return
+
+    @classmethod
+    def get_rs(cls, insts):
+        return Called.gets([self.a for self in insts])
+
+
+def make(n):
+    return [NC(i) for i in range(n)]
+
+
+class PolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+
+    def tearDown(self):
+        set_prefetch_policy(None)
+        adaptive.clear()
+
+    def test_eager(self):
+        ncs = make(10)
+        self.assertEqual([nc.q for nc in ncs], list(range(10)))
+        self.assertEqual([nc.r() for nc in ncs], list(range(10)))
+        self.assertEqual(Called.calls, [10, 10])
+
+        [nc.p for nc in ncs]
+        self.assertEqual(Called.calls, [10, 10, 1, 9])
+
+    def test_global(self):
+        set_prefetch_policy(EAGER)
+        ncs = make(10)
+        [nc.p for nc in ncs]
+        self.assertEqual(Called.calls, [10])
+
+        with self.assertRaises(NError):
+            set_prefetch_policy('always')
+        with self.assertRaises(NError):
+            n_property(prefetch='always')
+
+    def test_adaptive(self):
+        '''
+        同一位置构造的对象多次发生 probe + 批量获取之后，直接批量获取
+        '''
+        set_prefetch_policy(ADAPTIVE)
+        for _ in range(adaptive.min_samples + 1):
+            [nc.p for nc in make(10)]
+        self.assertEqual(Called.calls, [1, 9] * adaptive.min_samples + [10])
+
+        '''
+        只访问一个对象的位置保持 probe
+        '''
+        Called.calls = []
+        for _ in range(adaptive.min_samples + 1):
+            make(10)[0].p
+        self.assertEqual(Called.calls, [1] * (adaptive.min_samples + 1))
+
+    def test_default(self):
+        ncs = make(10)
+        set_prefetch_policy(SECOND_ACCESS)
+        [nc.p for nc in ncs]
+        self.assertEqual(Called.calls, [1, 9])
+
+
+class Called(object):
+    calls = []
+
+    @classmethod
+    def gets(cls, ids):
+        cls.calls.append(len(ids))
+        return ids
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+from n_property import n_class, n_property, prefetch, NError
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return Called.gets('p', [self.a for self in selfs])
+
+    @n_property
+    def q(selfs):
+        return Called.gets('q', [self.a * 2 for self in selfs])
+
+    @n_property(co_fetch=('p', 'q'))
+    def r(selfs):
+        return Called.gets('r', [self.a * 3 for self in selfs])
+
+    def s(self):
+        return
+
+
+class NC2(NC):
+    pass
+
+
+class PrefetchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+        Called.delay = 0
+
+    def test_prefetch(self):
+        ncs = [NC(i) for i in range(10)]
+        ncs[0].p
+        prefetch(ncs, 'p', 'q')
+        self.assertEqual(sorted(Called.calls), [('p', 1), ('p', 9), ('q', 10)])
+
+        self.assertEqual([nc.p for nc in ncs], list(range(10)))
+        self.assertEqual([nc.q for nc in ncs], [i * 2 for i in range(10)])
+        self.assertEqual(len(Called.calls), 3)
+
+        with self.assertRaises(NError):
+            prefetch(ncs, 's')
+
+    def test_concurrent(self):
+        Called.delay = 0.1
+        ncs = [NC(i) for i in range(5)] + [NC2(i) for i in range(5)]
+        start = time.time()
+        prefetch(ncs, 'p', 'q')
+        self.assertLess(time.time() - start, 0.3)
+        self.assertEqual(len(Called.calls), 4)
+        self.assertGreater(len(Called.threads), 1)
+
+    def test_co_fetch(self):
+        ncs = [NC(i) for i in range(10)]
+        [nc.r for nc in ncs]
+        self.assertEqual(
+            sorted(Called.calls),
+            [('p', 1), ('p', 9), ('q', 1), ('q', 9), ('r', 1), ('r', 9)],
+        )
+        self.assertEqual([nc.q for nc in ncs], [i * 2 for i in range(10)])
+        self.assertEqual(len(Called.calls), 6)
+
+
+class Called(object):
+    calls = []
+    threads = set()
+    delay = 0
+
+    @classmethod
+    def gets(cls, name, ids):
+        time.sleep(cls.delay)
+        cls.calls.append((name, len(ids)))
+        cls.threads.add(threading.current_thread())
+        return ids
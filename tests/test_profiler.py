@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import unittest
+from n_property import n_class, n_property, Profiler, get_metrics, prefetch
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return [self.a for self in selfs]
+
+    @property
+    def plain(self):
+        return self.a
+
+    def method(self, b):
+        return self.a + b
+
+    @n_property
+    def child(selfs):
+        return [NC(self.a) for self in selfs]
+
+
+def make(n):
+    return [NC(i) for i in range(n)]
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def test_profiler(self):
+        origin = NC.__dict__['plain']
+        with Profiler() as profiler:
+            self.assertIs(get_metrics(), profiler)
+            ncs = make(5)
+            self.assertEqual([nc.p for nc in ncs], list(range(5)))
+            self.assertEqual([nc.plain for nc in ncs], list(range(5)))
+            self.assertEqual(ncs[0].method(1), 1)
+            self.assertEqual(ncs[1].method(1), 2)
+
+            '''
+            每次只构造一个对象，每个都单独获取
+            '''
+            for i in range(3):
+                make(1)[0].p
+
+        self.assertIsNone(get_metrics())
+        self.assertIs(NC.__dict__['plain'], origin)
+
+        name = '%s.NC.p' % __name__
+        singletons = profiler.singletons()
+        self.assertEqual([r[:2] for r in singletons], [(3, name), (1, name)])  # 两个构造位置
+
+        repeated = profiler.repeated()
+        self.assertEqual(
+            [r[:3] for r in repeated],
+            [(5, 5, '%s.NC.plain' % __name__), (2, 2, '%s.NC.method' % __name__)],
+        )
+        self.assertEqual(profiler.unbatched(), [])
+
+        report = profiler.report()
+        self.assertIn('singleton fetches', report)
+        self.assertIn('%s.NC.plain @ ' % __name__, report)
+        self.assertIn('(none)', report)
+
+        profiler.clear()
+        self.assertEqual(profiler.repeated(), [])
+
+    def test_unbatched(self):
+        with Profiler() as profiler:
+            ncs = make(3)
+            for nc in ncs:
+                prefetch([nc], 'p')  # 逐个获取
+        rows = profiler.unbatched()
+        self.assertEqual([r[:3] for r in rows], [(3, 3, '%s.NC.p' % __name__)])
+
+    def test_batch_site(self):
+        with Profiler() as profiler:
+            for _ in range(3):
+                [nc.child.plain for nc in make(4)]
+        name = '%s.NC' % __name__
+        self.assertEqual(profiler.session_sizes[(name, name + '.child')], 3)  # probe 之后的一批
+        self.assertEqual(len(profiler.session_sizes), 2)
+        self.assertEqual(
+            [r[:3] for r in profiler.repeated()], [(12, 12, name + '.plain')])
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+import gc
+import time
+import unittest
+from n_property import n_class, n_property, n_method, NMethod, SessionRegistry
+
+
+class Obj(object):
+    pass
+
+
+class SessionRegistryTestCase(unittest.TestCase):
+
+    def test_cleanup(self):
+        registry = SessionRegistry()
+        objs = [Obj() for _ in range(5)]
+        for o in objs:
+            registry.add('a', o)
+        del o
+        self.assertEqual(registry.stats()['refs'], 5)
+
+        del objs[:3]
+        gc.collect()
+        self.assertEqual(len(registry.get('a').members()), 2)
+        self.assertEqual(registry.stats()['refs'], 2)
+
+        del objs[:]
+        gc.collect()
+        self.assertNotIn('a', registry)
+        self.assertEqual(registry.stats()['sessions'], 0)
+
+    def test_lru(self):
+        registry = SessionRegistry(max_sessions=2)
+        objs = [Obj() for _ in range(3)]
+        registry.add('a', objs[0])
+        registry.add('b', objs[1])
+        registry.get('a')
+        registry.add('c', objs[2])
+        self.assertIn('a', registry)
+        self.assertNotIn('b', registry)
+        self.assertIn('c', registry)
+
+    def test_ttl(self):
+        registry = SessionRegistry(ttl=0.01)
+        objs = [Obj() for _ in range(2)]
+        registry.add('a', objs[0])
+        time.sleep(0.02)
+        registry.add('b', objs[1])
+        self.assertNotIn('a', registry)
+        self.assertIn('b', registry)
+
+    def test_counts(self):
+        '''
+        n_property 的访问计数跟随 session 一起删除
+        '''
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_property
+            def p(selfs):
+                return [self.a for self in selfs]
+
+        sessions = n_property.sessions
+        ncs = [NC(i) for i in range(3)]
+        ncs[0].p
+        key = (NC, ncs[0]._nc_frame_id)
+        self.assertEqual(sessions.get(key).counts, {'p': 1})
+
+        del ncs[:]
+        gc.collect()
+        self.assertNotIn(key, sessions)
+
+        stats = sessions.stats()
+        self.assertEqual(
+            set(stats), set(['sessions', 'refs', 'alive', 'counts', 'bytes']))
+        self.assertGreater(stats['bytes'], 0)
+
+    def test_shared(self):
+        '''
+        n_property 与 n_method 共用一个 session，每个对象只有一个 weakref
+        '''
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_property
+            def p(selfs):
+                return [self.a for self in selfs]
+
+            @n_method(implement='get_qs')
+            def q(self):
+                return
+
+            @classmethod
+            def get_qs(cls, insts):
+                return [self.a for self in insts]
+
+        self.assertIs(n_property.sessions, NMethod.sessions)
+        ncs = [NC(i) for i in range(10)]
+        session = n_property.sessions.get((NC, ncs[0]._nc_frame_id))
+        self.assertEqual(len(session.refs), 10)
+
+        self.assertEqual([nc.p for nc in ncs], list(range(10)))
+        self.assertEqual([nc.q() for nc in ncs], list(range(10)))
+
+    def test_compaction(self):
+        registry = SessionRegistry()
+        keep = []
+        for i in range(100):
+            o = Obj()
+            registry.add('a', o)
+            if i % 10 == 0:
+                keep.append(o)
+        del o
+        gc.collect()
+        session = registry.get('a')
+        self.assertEqual(session.alive, 10)
+        self.assertLessEqual(len(session.refs), 2 * session.alive + 9)
+
+    def test_evicted_n_method(self):
+        '''
+        session 被淘汰后同一位置重建的 session 不包含之前的对象，n_method 仍返回正确结果
+        '''
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_method(implement='get_ps')
+            def p(self, incr):
+                return 'FALLBACK'
+
+            @classmethod
+            def get_ps(cls, insts, incr):
+                return [self.a + incr for self in insts]
+
+        def make(a):
+            return NC(a)
+
+        sessions = n_property.sessions
+        max_sessions = sessions.max_sessions
+        sessions.max_sessions = 2
+        try:
+            built = []
+            for i in range(2):
+                built.append(make(i))  # 同一位置构造
+                if i == 0:
+                    x = NC(1)
+                    y = NC(2)  # 两个新位置，淘汰 a 所在的 session
+            a, b = built
+            self.assertEqual(b.p(1), 2)
+            self.assertEqual(a.p(1), 1)
+            self.assertEqual([x.p(1), y.p(1)], [2, 3])
+        finally:
+            sessions.max_sessions = max_sessions
+
+    def test_evicted_eq(self):
+        '''
+        session 被淘汰后重建，其中有与 obj 相等（__eq__）的其他对象时 obj 仍被获取
+        '''
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            def __eq__(self, other):
+                return self.a == other.a
+
+            __hash__ = object.__hash__
+
+            @n_property
+            def p(selfs):
+                return [self.a for self in selfs]
+
+        def make(a):
+            return NC(a)
+
+        sessions = n_property.sessions
+        max_sessions = sessions.max_sessions
+        sessions.max_sessions = 2
+        try:
+            built = []
+            for i, a in enumerate((0, 0, 5)):
+                built.append(make(a))  # 同一位置构造
+                if i == 0:
+                    x = NC(1)
+                    y = NC(2)  # 两个新位置，淘汰 old 所在的 session
+            old, new, other = built
+            self.assertEqual(other.p, 5)
+            self.assertEqual(old.p, 0)
+            self.assertEqual(new.p, 0)
+            self.assertEqual([x.p, y.p], [1, 2])
+        finally:
+            sessions.max_sessions = max_sessions
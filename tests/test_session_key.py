@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import pickle
+import re
+import unittest
+from n_property import (
+    n_class, n_property, get_frame_key, get_frame_chain_id, format_frame_key,
+    set_session_key,
+)
+
+
+class SessionKeyTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        set_session_key(None)
+
+    def test_frame_key(self):
+        def make():
+            return get_frame_key(start_depth=1)
+
+        keys = [make() for _ in range(3)]
+        self.assertEqual(len(set(keys)), 1)
+        self.assertNotEqual(make(), keys[0])
+
+        self.assertEqual(len(re.split(r'<-|\|', get_frame_key(start_depth=1, max_depth=2))), 2)
+
+        self.assertIn(__file__.rstrip('c'), keys[0])
+        self.assertIs(keys[1], keys[0])
+        self.assertIs(format_frame_key(keys[0]), keys[0])
+
+    def test_pickle(self):
+        rows = [Row(i) for i in range(3)]
+        self.assertIs(rows[1]._nc_frame_id, rows[0]._nc_frame_id)
+
+        row = pickle.loads(pickle.dumps(rows[0]))
+        self.assertEqual(row.a, 0)
+        self.assertEqual(row.p, 0)
+
+    def test_set_session_key(self):
+        @n_class
+        class NC(object):
+            def __init__(self, a):
+                self.a = a
+
+            @n_property
+            def p(selfs):
+                Called.call_count += 1
+                return [self.a for self in selfs]
+
+        set_session_key(get_frame_chain_id)
+        ncs = [NC(i) for i in range(10)]
+        self.assertIsInstance(ncs[0]._nc_frame_id, str)
+
+        Called.call_count = 0
+        [nc.p for nc in ncs]
+        self.assertEqual(Called.call_count, 2)
+
+        set_session_key(lambda: 'same')
+        ncs = [NC(1), NC(2)]
+        ncs += [NC(3)]
+        [nc.p for nc in ncs]
+        self.assertEqual(Called.call_count, 4)
+
+
+class Called(object):
+    call_count = 0
+
+
+@n_class
+class Row(object):
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return [self.a for self in selfs]
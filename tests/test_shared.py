@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import time
+import unittest
+from n_property import n_class, n_property, SharedMemoryCache, NError
+from n_property.shared import SLOT, _dump_key
+
+
+cache = SharedMemoryCache(sets=64, ways=4, slot_size=256)
+
+
+@n_class
+class NC(object):
+    def __init__(self, a):
+        self.a = a
+
+    p = n_property(fallback=-1, cache=cache, key=lambda inst: inst.a)
+
+    @p.n_getter
+    @classmethod
+    def get_ps(cls, insts):
+        Called.calls.append([self.a for self in insts])
+        return [{'a': self.a, 'pid': os.getpid()} for self in insts]
+
+
+class SharedMemoryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        Called.calls = []
+        cache.clear()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_fork(self):
+        '''
+        子进程获取的结果，父进程直接命中
+        '''
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                ncs = [NC(i) for i in range(10)]
+                [nc.p for nc in ncs]
+                code = 0 if len(Called.calls) == 2 else 1
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+
+        ncs = [NC(i) for i in range(12)]
+        ps = [nc.p for nc in ncs]
+        self.assertEqual([p['a'] for p in ps], list(range(12)))
+        self.assertEqual(set(p['pid'] for p in ps[:10]), {pid})
+        self.assertEqual(ps[10]['pid'], os.getpid())
+        self.assertEqual(Called.calls, [[10, 11]])
+        self.assertEqual(len(cache), 12)
+
+    def test_evict(self):
+        c = SharedMemoryCache(sets=1, ways=2, slot_size=128, ttl=0.05)
+        c.set_many({1: 'a', 2: 'b'})
+        self.assertEqual(c.get_many([1, 3]), {1: 'a'})
+        c.set_many({3: 'c'})  # 淘汰最久未使用的 2
+        self.assertEqual(c.get_many([1, 2, 3]), {1: 'a', 3: 'c'})
+        self.assertEqual(c.evictions, 1)
+
+        c.set_many({4: 'x' * 200})
+        self.assertEqual(c.oversize, 1)
+        c.delete_many([1])
+        self.assertEqual(c.get_many([1, 3]), {3: 'c'})
+        time.sleep(0.06)
+        self.assertEqual(c.get_many([3]), {})
+        self.assertEqual(c.stats()['hits'], 4)
+        c.close()
+
+    def test_corrupt(self):
+        '''
+        不能读取的结果按未命中处理，并清空该槽
+        '''
+        c = SharedMemoryCache(sets=1, ways=2, slot_size=128)
+        c.set_many({1: 'a', 2: 'b'})
+        kb, h = _dump_key(1)
+        offset, vb = c._find(h, kb, 0)
+        start = offset + SLOT.size + len(kb)
+        c._mem[start:start + len(vb)] = b'\xff' * len(vb)
+
+        self.assertEqual(c.get_many([1, 2]), {2: 'b'})
+        self.assertEqual((c.hits, c.misses), (1, 1))
+        self.assertEqual(len(c), 1)
+        c.set_many({1: 'a'})
+        self.assertEqual(c.get_many([1]), {1: 'a'})
+        c.close()
+
+    def test_path(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        os.unlink(path)
+        try:
+            a = SharedMemoryCache(sets=4, ways=2, slot_size=128, path=path)
+            a.set_many({('ns', 1): [1, 2]})
+            b = SharedMemoryCache(sets=4, ways=2, slot_size=128, path=path)
+            self.assertEqual(b.get_many([('ns', 1)]), {('ns', 1): [1, 2]})
+            with self.assertRaises(NError):
+                SharedMemoryCache(sets=8, ways=2, slot_size=128, path=path)
+            a.close()
+            b.close()
+
+            os.chmod(path, 0o644)
+            with self.assertRaises(NError):
+                SharedMemoryCache(sets=4, ways=2, slot_size=128, path=path)
+            os.chmod(path, 0o600)
+            if os.geteuid() == 0:
+                os.chown(path, 65534, -1)
+                with self.assertRaises(NError):
+                    SharedMemoryCache(sets=4, ways=2, slot_size=128, path=path)
+        finally:
+            os.unlink(path)
+
+
+class Called(object):
+    calls = []
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import gc
+import unittest
+from n_property import n_class, n_property, n_method, NError
+from n_property.storage import state_of, _side
+
+
+@n_class
+class NC(object):
+    __slots__ = ('a', '__weakref__')
+
+    def __init__(self, a):
+        self.a = a
+
+    @n_property
+    def p(selfs):
+        return Called.gets([self.a for self in selfs])
+
+    @n_method(implement='get_qs')
+    def q(self, incr):
+        return
+
+    @classmethod
+    def get_qs(cls, insts, incr):
+        return Called.gets([self.a + incr for self in insts])
+
+
+class SlotsTestCase(unittest.TestCase):
+
+    def test_slots(self):
+        Called.call_count = 0
+        ncs = [NC(i) for i in range(10)]
+        self.assertFalse(hasattr(ncs[0], '__dict__'))
+
+        [ncs[0].p for nc in ncs]
+        self.assertEqual(Called.call_count, 1)
+        ps = [nc.p for nc in ncs]
+        self.assertEqual(Called.call_count, 2)
+        self.assertEqual(ps, list(range(10)))
+        self.assertEqual([nc.p for nc in ncs], ps)
+        self.assertEqual(Called.call_count, 2)
+
+        qs = [nc.q(1) for nc in ncs]
+        self.assertEqual(Called.call_count, 4)
+        self.assertEqual(qs, list(range(1, 11)))
+
+        self.assertEqual(state_of(ncs[3])['p'], 3)
+        size = len(_side)
+        del ncs[:]
+        gc.collect()
+        self.assertEqual(len(_side), size - 10)
+
+    def test_weakref_required(self):
+        with self.assertRaises(NError):
+            @n_class  # noqa pylint: disable=C,W
+            class NC2(object):
+                __slots__ = ('a',)
+
+        with self.assertRaises(Exception) as ctx:
+            class NC3(object):  # noqa pylint: disable=C,W
+                __slots__ = ('a',)
+
+                @n_property
+                def p(selfs):
+                    return [1 for _ in selfs]
+        error = ctx.exception  # Python 3.12 之前 __set_name__ 中的异常被包装为 RuntimeError
+        self.assertIsInstance(error.__cause__ or error, NError)
+
+    def test_state_slot(self):
+        @n_class
+        class NC4(object):
+            __slots__ = ('a', '_nc_state', '__weakref__')
+
+            def __init__(self, a):
+                self.a = a
+
+            @n_property
+            def p(selfs):
+                return Called.gets([self.a for self in selfs])
+
+        size = len(_side)
+        ncs = [NC4(i) for i in range(5)]
+        self.assertEqual([nc.p for nc in ncs], list(range(5)))
+        self.assertEqual(ncs[2]._nc_state['p'], 2)
+        self.assertEqual(len(_side), size)
+
+
+class Called(object):
+    call_count = 0
+
+    @classmethod
+    def gets(cls, ids):
+        cls.call_count += 1
+        return ids